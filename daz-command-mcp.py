@@ -8,20 +8,7 @@ from __future__ import annotations
 import argparse
 import signal
 import sys
-from typing import Any
-
-# Graceful LLM dependency check - allow system to continue without it
-_dazllm_available = False
-try:
-    from dazllm import Llm
-    _dazllm_available = True
-except ImportError as e:
-    print(f"[mcp] dazllm module not available: {e}", file=sys.stderr)
-    print(f"[mcp] LLM functionality will be disabled, but other functionality will continue", file=sys.stderr)
-    Llm = None
-
-from src.summary_worker import ensure_summary_thread, wait_for_summary_worker_init, is_summary_system_available, should_start_summary_worker
-from src.mcp_tools import mcp
+from typing import Any, List
 
 LLM_MODEL_NAME = "lm-studio:openai/gpt-oss-20b"
 
@@ -32,49 +19,62 @@ def main() -> None:
     # Remove the port argument since MCP servers communicate over stdio
     args = parser.parse_args()
 
-    # Check LLM availability but don't fail if not available
-    llm_available = False
-    if _dazllm_available:
-        try:
-            llm_check = Llm()
-            if llm_check: 
-                llm_available = True
-                print("[mcp] LLM connection verified", file=sys.stderr)
-            else:
-                print("[mcp] LLM check failed - continuing without LLM functionality", file=sys.stderr)
-        except Exception as e:
-            print(f"[mcp] LLM check error: {e} - continuing without LLM functionality", file=sys.stderr)
-    else:
-        print("[mcp] dazllm not available - continuing without LLM functionality", file=sys.stderr)
+    # Heavy dependencies (dazllm, fastmcp) are imported only once we know the server is starting.
+    # dazllm availability is resolved once when the summary modules load; the worker makes
+    # the only Llm instance, so no separate connection check is made here.
+    from src.summary_worker import ensure_summary_thread, wait_for_summary_worker_init, is_summary_system_available, should_start_summary_worker, shutdown_summary_worker
+
+    # Startup status lines are collected and written to stderr in one call rather than one write per line
+    startup_log: List[str] = []
+
+    def flush_startup_log() -> None:
+        if startup_log:
+            sys.stderr.write("\n".join(startup_log) + "\n")
+            sys.stderr.flush()
+            startup_log.clear()
 
     # Only start summary worker if LLM is available
     if should_start_summary_worker():
-        print("[mcp] starting summary worker thread...", file=sys.stderr)
+        startup_log.append("[mcp] starting summary worker thread...")
         ensure_summary_thread()
         
+        # The worker imports dazllm and builds its Llm while fastmcp is imported here
+        try:
+            from src.mcp_tools import mcp
+        except BaseException:
+            # Don't lose the status lines already buffered if the import fails
+            flush_startup_log()
+            raise
+        
         # Wait for summary worker initialization
         try:
-            print("[mcp] waiting for summary worker initialization...", file=sys.stderr)
+            startup_log.append("[mcp] waiting for summary worker initialization...")
+            # Written now, not batched: the wait below can block for up to 30 seconds
+            flush_startup_log()
             wait_for_summary_worker_init(timeout=30.0)  # 30 second timeout
             
             if is_summary_system_available():
-                print("[mcp] summary worker successfully initialized with LLM functionality", file=sys.stderr)
+                startup_log.append("[mcp] summary worker successfully initialized with LLM functionality")
             else:
-                print("[mcp] summary worker initialization completed but LLM unavailable", file=sys.stderr)
+                startup_log.append("[mcp] summary worker initialization completed but LLM unavailable")
                 
         except RuntimeError as e:
-            print(f"FATAL ERROR: Summary worker initialization failed: {e}", file=sys.stderr)
-            print("[mcp] The MCP server cannot start without a working summary worker", file=sys.stderr)
+            startup_log.append(f"FATAL ERROR: Summary worker initialization failed: {e}")
+            startup_log.append("[mcp] The MCP server cannot start without a working summary worker")
+            flush_startup_log()
             sys.exit(1)
         except Exception as e:
-            print(f"FATAL ERROR: Unexpected error during summary worker initialization: {e}", file=sys.stderr)
+            startup_log.append(f"FATAL ERROR: Unexpected error during summary worker initialization: {e}")
+            flush_startup_log()
             sys.exit(1)
     else:
-        print("[mcp] LLM not available - skipping summary worker entirely", file=sys.stderr)
-        print("[mcp] Summary generation will be disabled, all other functionality will work normally", file=sys.stderr)
+        from src.mcp_tools import mcp
+        startup_log.append("[mcp] LLM not available - skipping summary worker entirely")
+        startup_log.append("[mcp] Summary generation will be disabled, all other functionality will work normally")
 
     def signal_handler(sig: int, frame: Any) -> None:
         print("\n[mcp] shutting down gracefully...", file=sys.stderr)
+        shutdown_summary_worker()
         sys.exit(0)
 
     signal.signal(signal.SIGINT, signal_handler)
@@ -82,14 +82,18 @@ def main() -> None:
 
     # Final status message
     if should_start_summary_worker() and is_summary_system_available():
-        print("[mcp] starting server with full functionality (including LLM summaries)...", file=sys.stderr)
+        startup_log.append("[mcp] starting server with full functionality (including LLM summaries)...")
     else:
-        print("[mcp] starting server with core functionality (LLM summaries disabled)...", file=sys.stderr)
+        startup_log.append("[mcp] starting server with core functionality (LLM summaries disabled)...")
     
-    print("[mcp] server running over stdio...", file=sys.stderr)
+    startup_log.append("[mcp] server running over stdio...")
+    flush_startup_log()
     
     # Run without port argument - MCP servers communicate over stdio
-    mcp.run()
+    try:
+        mcp.run()
+    finally:
+        shutdown_summary_worker()
 
 
 if __name__ == "__main__":
@@ -5,16 +5,287 @@ Command execution functionality for DAZ Command MCP Server
 
 from __future__ import annotations
 
+import errno
+import locale
+import mmap
 import os
+import selectors
+import shutil
+import signal
+import stat
 import subprocess
 import time
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from .models import Event
-from .utils import get_active_session_name
+from .utils import get_active_session_name, resolve_path, get_working_directory, change_working_directory
 from .session_manager import append_event
 
+# fcntl is POSIX-only; without it pipes keep their default kernel buffer size
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# Files larger than this are decoded straight from a read-only memory mapping
+_MMAP_READ_THRESHOLD = 64 * 1024
+
+
+# Mappings at least this large also ask for transparent huge pages, to cut TLB misses during the decode
+_HUGEPAGE_READ_THRESHOLD = 2 * 1024 * 1024
+
+
+def _advise_one_pass_read(mapping: mmap.mmap, size: int) -> None:
+    """Tell the kernel a mapping is read once, front to back, so it reads ahead aggressively."""
+    advice = ["MADV_SEQUENTIAL", "MADV_WILLNEED"]
+    if size >= _HUGEPAGE_READ_THRESHOLD:
+        advice.append("MADV_HUGEPAGE")
+    for name in advice:
+        flag = getattr(mmap, name, None)  # Missing on platforms without madvise or that advice
+        if flag is None:
+            continue
+        try:
+            mapping.madvise(flag)
+        except OSError:
+            # Only a hint; e.g. MADV_HUGEPAGE is refused for files on many kernels
+            pass
+
+
+def _read_text_file(path: Path) -> str:
+    """
+    Read a UTF-8 text file with a single decode, skipping the text-mode file object.
+    Large files are decoded directly off an mmap of the file, so no intermediate bytes
+    copy is made. Newlines are normalized the same way Path.read_text does.
+    """
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+    try:
+        st = os.fstat(fd)
+        if stat.S_ISDIR(st.st_mode):
+            raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR), str(path))
+        size = st.st_size
+        if size > _MMAP_READ_THRESHOLD:
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mapping:
+                _advise_one_pass_read(mapping, size)
+                with memoryview(mapping) as view:
+                    content = str(view, "utf-8")
+        else:
+            with open(fd, "rb", closefd=False) as f:
+                content = f.read().decode("utf-8")
+    finally:
+        os.close(fd)
+    if "\r" in content:
+        content = content.replace("\r\n", "\n").replace("\r", "\n")
+    return content
+
+
+# Large writes are issued in slices of at most this many bytes
+_WRITE_CHUNK_SIZE = 1 << 20
+
+def _open_for_write(path: Path) -> int:
+    """Open (creating or truncating) a file for writing; errors surface here, before any data is written."""
+    return os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_CLOEXEC", 0), 0o644)
+
+
+def _write_and_close(fd: int, data: memoryview) -> None:
+    """Write all of data to fd in _WRITE_CHUNK_SIZE slices, continuing short writes, then close it."""
+    try:
+        while data:
+            data = data[os.write(fd, data[:_WRITE_CHUNK_SIZE]):]
+    finally:
+        os.close(fd)
+
+
+def _write_text_file(path: Path, content: str) -> None:
+    """
+    Write text to a file as UTF-8 with os.write on a raw descriptor, skipping the buffered
+    text-mode file object. Returns only once every byte is written, so failures such as a
+    full disk are reported to the caller.
+    """
+    data = memoryview(content.encode("utf-8"))
+    _write_and_close(_open_for_write(path), data)
+
+
+# copy_file_range errors that mean "not supported for these files" rather than a real failure
+_COPY_RANGE_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP}
+
+
+def _copy_file_data(source: Path, destination: Path) -> int:
+    """
+    Copy a file's bytes into destination (created or truncated) and return the count.
+    Uses copy_file_range where available so the data stays in the kernel, falling back
+    to an os.read/os.write loop across filesystems or platforms that don't support it.
+    """
+    source_fd = os.open(source, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+    try:
+        source_stat = os.fstat(source_fd)
+        if stat.S_ISDIR(source_stat.st_mode):
+            raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR), str(source))
+        # Opening the destination truncates it, so a copy onto the source itself (the same path,
+        # a symlink or a hard link to it) would empty the file before reading a byte of it
+        try:
+            destination_stat = os.stat(destination)
+        except FileNotFoundError:
+            destination_stat = None
+        if destination_stat is not None and (destination_stat.st_dev, destination_stat.st_ino) == (source_stat.st_dev, source_stat.st_ino):
+            raise shutil.SameFileError(f"{source} and {destination} are the same file")
+        destination_fd = _open_for_write(destination)
+        try:
+            copied = 0
+            if hasattr(os, "copy_file_range"):
+                try:
+                    # Copy until EOF rather than trusting st_size, which may change or be 0 (e.g. /proc)
+                    while True:
+                        count = os.copy_file_range(source_fd, destination_fd, 1 << 30)
+                        if count:
+                            copied += count
+                        elif copied:
+                            return copied
+                        else:
+                            # Nothing copied: an empty file, or one (e.g. procfs) the kernel won't copy
+                            break
+                except OSError as e:
+                    if copied or e.errno not in _COPY_RANGE_UNSUPPORTED:
+                        raise
+            while True:
+                chunk = os.read(source_fd, _WRITE_CHUNK_SIZE)
+                if not chunk:
+                    return copied
+                view = memoryview(chunk)
+                while view:
+                    view = view[os.write(destination_fd, view):]
+                copied += len(chunk)
+        finally:
+            os.close(destination_fd)
+    finally:
+        os.close(source_fd)
+
+
+# Pipe reads pull up to this many bytes per os.read call
+_PIPE_READ_SIZE = 1 << 20
+
+# Kernel buffer requested for each output pipe (Linux defaults to 64KB; 1MB is the unprivileged
+# pipe-max-size), so a chatty command fills fewer buffers and each wakeup reads more at once
+_PIPE_BUFFER_SIZE = 1 << 20
+_F_SETPIPE_SZ = getattr(fcntl, "F_SETPIPE_SZ", 1031)  # Python < 3.10 lacks the constant
+
+# Only the last this-many bytes of each stream are kept; earlier output is dropped as it arrives
+_OUTPUT_TAIL_BYTES = 256 * 1024
+
+
+def _decode_output(data: bytearray, dropped: int) -> str:
+    """Decode captured output once, with the same newline translation as text-mode pipes."""
+    if len(data) > _OUTPUT_TAIL_BYTES:
+        dropped += len(data) - _OUTPUT_TAIL_BYTES
+        del data[:-_OUTPUT_TAIL_BYTES]
+    text = data.decode(locale.getpreferredencoding(False), errors="replace")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    if dropped:
+        text = f"...(truncated {dropped} bytes)...{text}"
+    return text
+
+
+def _grow_pipe_buffer(fd: int) -> None:
+    """Best-effort enlarge a pipe's kernel buffer; unsupported platforms and limits are ignored."""
+    if fcntl is None:
+        return
+    try:
+        fcntl.fcntl(fd, _F_SETPIPE_SZ, _PIPE_BUFFER_SIZE)
+    except OSError:
+        pass
+
+
+def _kill_process_group(process: subprocess.Popen) -> None:
+    """Kill the command's whole process group (it runs in its own session) and reap it."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except OSError:
+        process.kill()
+    process.wait()
+
+
+def _run_shell_command(command: str, timeout: Optional[float], cwd: str) -> Tuple[str, str, int, bool]:
+    """
+    Run a shell command and capture its output by reading the pipe fds directly.
+    
+    Both pipes are drained from this thread with a selector and 1MB os.read calls into
+    per-stream bytearrays, decoded once at the end. Each stream keeps only its last
+    _OUTPUT_TAIL_BYTES, so a very chatty command can't grow memory or the event log
+    without bound. Raises subprocess.TimeoutExpired (after killing the command) if it
+    runs past the timeout.
+    
+    Returns:
+        Tuple of (stdout, stderr, returncode, truncated), truncated being True if either
+        stream had output dropped
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        # Own session: detached from the server's terminal, without a preexec_fn slow path
+        start_new_session=True,
+    )
+    try:
+        stdout_fd = process.stdout.fileno()
+        stderr_fd = process.stderr.fileno()
+        stdout_data = bytearray()
+        stderr_data = bytearray()
+        buffers = {stdout_fd: stdout_data, stderr_fd: stderr_data}
+        for fd in buffers:
+            _grow_pipe_buffer(fd)
+        dropped = {fd: 0 for fd in buffers}
+        with selectors.DefaultSelector() as selector:
+            for fd in buffers:
+                selector.register(fd, selectors.EVENT_READ)
+            while selector.get_map():
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        _kill_process_group(process)
+                        raise subprocess.TimeoutExpired(command, timeout)
+                for key, _ in selector.select(remaining):
+                    chunk = os.read(key.fd, _PIPE_READ_SIZE)
+                    if chunk:
+                        data = buffers[key.fd]
+                        data += chunk
+                        # Trim in large steps so the front of the buffer isn't shifted on every read
+                        if len(data) > 2 * _OUTPUT_TAIL_BYTES:
+                            dropped[key.fd] += len(data) - _OUTPUT_TAIL_BYTES
+                            del data[:-_OUTPUT_TAIL_BYTES]
+                    else:
+                        selector.unregister(key.fd)
+        
+        try:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            returncode = process.wait(timeout=remaining)
+        except subprocess.TimeoutExpired:
+            _kill_process_group(process)
+            raise
+    except BaseException:
+        if process.poll() is None:
+            _kill_process_group(process)
+        raise
+    finally:
+        process.stdout.close()
+        process.stderr.close()
+    
+    truncated = (
+        dropped[stdout_fd] + len(stdout_data) > _OUTPUT_TAIL_BYTES
+        or dropped[stderr_fd] + len(stderr_data) > _OUTPUT_TAIL_BYTES
+    )
+    return (
+        _decode_output(stdout_data, dropped[stdout_fd]),
+        _decode_output(stderr_data, dropped[stderr_fd]),
+        returncode,
+        truncated,
+    )
+
 
 def _clean_command_result(result: Dict[str, Any], include_session: bool = False) -> Dict[str, Any]:
     """
@@ -25,6 +296,7 @@ def _clean_command_result(result: Dict[str, Any], include_session: bool = False)
     - Remove exitcode if zero
     - Remove command (always)
     - Remove killed if false
+    - Remove truncated if false
     - Remove duration (always)
     - Remove session unless include_session is True
     """
@@ -53,6 +325,9 @@ def _clean_command_result(result: Dict[str, Any], include_session: bool = False)
     if "killed" in result and result["killed"]:  # Only include if true
         cleaned["killed"] = result["killed"]
     
+    if "truncated" in result and result["truncated"]:  # Only include if true
+        cleaned["truncated"] = result["truncated"]
+    
     # Never include: command, duration
     
     # Include session only if requested (for open/current commands)
@@ -80,17 +355,19 @@ def add_learnings(learning_info: str) -> Dict[str, Any]:
     if not session_name:
         raise ValueError("No active session. Create or open a session first.")
 
-    start_time = time.time()
+    # Wall-clock time for the event record; the integer nanosecond counter for the duration
+    timestamp = time.time()
+    start_ns = time.perf_counter_ns()
 
     event: Event = {
-        "timestamp": start_time,
+        "timestamp": timestamp,
         "type": "learning",
         "current_task": "Capturing useful session context",
         "summary_of_what_we_just_did": "Identified important information to preserve",
         "summary_of_what_we_about_to_do": "Store this information for future session reference",
         "inputs": {"learning_info": learning_info},
         "outputs": {"captured": True, "info_length": len(learning_info)},
-        "duration": time.time() - start_time,
+        "duration": (time.perf_counter_ns() - start_ns) / 1e9,
     }
 
     session_data = append_event(session_name, event)
@@ -111,12 +388,13 @@ def change_directory(directory: str, current_task: str, summary_of_what_we_just_
     if not session_name:
         raise ValueError("No active session. Create or open a session first.")
 
-    start_time = time.time()
-    old_cwd = str(Path.cwd())
+    # Wall-clock time for the event record; the integer nanosecond counter for the duration
+    timestamp = time.time()
+    start_ns = time.perf_counter_ns()
+    old_cwd = get_working_directory()
 
     try:
-        os.chdir(directory)
-        new_cwd = str(Path.cwd())
+        new_cwd = change_working_directory(directory)
         success = True
         error_msg = ""
     except Exception as e:
@@ -125,14 +403,14 @@ def change_directory(directory: str, current_task: str, summary_of_what_we_just_
         error_msg = str(e)
 
     event: Event = {
-        "timestamp": start_time,
+        "timestamp": timestamp,
         "type": "cd",
         "current_task": current_task,
         "summary_of_what_we_just_did": summary_of_what_we_just_did,
         "summary_of_what_we_about_to_do": summary_of_what_we_about_to_do,
         "inputs": {"directory": directory, "old_cwd": old_cwd},
         "outputs": {"success": success, "new_cwd": new_cwd, "error": error_msg},
-        "duration": time.time() - start_time,
+        "duration": (time.perf_counter_ns() - start_ns) / 1e9,
     }
 
     session_data = append_event(session_name, event)
@@ -156,11 +434,15 @@ def read_file(file_path: str, current_task: str, summary_of_what_we_just_did: st
     if not session_name:
         raise ValueError("No active session. Create or open a session first.")
 
-    start_time = time.time()
-    path = Path(file_path)
+    # Wall-clock time for the event record; the integer nanosecond counter for the duration
+    timestamp = time.time()
+    start_ns = time.perf_counter_ns()
+    # Resolve once; the canonical path is used for the read, the event and the result
+    path = resolve_path(file_path)
+    absolute_path = str(path)
 
     try:
-        content = path.read_text(encoding="utf-8")
+        content = _read_text_file(path)
         success = True
         error_msg = ""
     except Exception as e:
@@ -169,14 +451,14 @@ def read_file(file_path: str, current_task: str, summary_of_what_we_just_did: st
         error_msg = str(e)
 
     event: Event = {
-        "timestamp": start_time,
+        "timestamp": timestamp,
         "type": "read",
         "current_task": current_task,
         "summary_of_what_we_just_did": summary_of_what_we_just_did,
         "summary_of_what_we_about_to_do": summary_of_what_we_about_to_do,
-        "inputs": {"file_path": file_path, "absolute_path": str(path.resolve())},
+        "inputs": {"file_path": file_path, "absolute_path": absolute_path},
         "outputs": {"success": success, "content_length": len(content), "error": error_msg},
-        "duration": time.time() - start_time,
+        "duration": (time.perf_counter_ns() - start_ns) / 1e9,
     }
 
     session_data = append_event(session_name, event)
@@ -187,7 +469,7 @@ def read_file(file_path: str, current_task: str, summary_of_what_we_just_did: st
     result = {
         "success": True,
         "content": content,
-        "file_path": str(path.resolve()),
+        "file_path": absolute_path,
         "session": session_data,
     }
     
@@ -200,13 +482,18 @@ def write_file(file_path: str, content: str, current_task: str, summary_of_what_
     if not session_name:
         raise ValueError("No active session. Create or open a session first.")
 
-    start_time = time.time()
-    path = Path(file_path)
+    # Wall-clock time for the event record; the integer nanosecond counter for the duration
+    timestamp = time.time()
+    start_ns = time.perf_counter_ns()
+    # Resolve once; the canonical path is used for the write, the event and the result
+    path = resolve_path(file_path)
+    absolute_path = str(path)
 
     try:
         if create_dirs:
-            path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(content, encoding="utf-8")
+            # makedirs on the resolved string: one stat when the directory exists, no Path objects
+            os.makedirs(os.path.dirname(absolute_path), exist_ok=True)
+        _write_text_file(path, content)
         success = True
         error_msg = ""
     except Exception as e:
@@ -214,24 +501,80 @@ def write_file(file_path: str, content: str, current_task: str, summary_of_what_
         error_msg = str(e)
 
     event: Event = {
-        "timestamp": start_time,
+        "timestamp": timestamp,
         "type": "write",
         "current_task": current_task,
         "summary_of_what_we_just_did": summary_of_what_we_just_did,
         "summary_of_what_we_about_to_do": summary_of_what_we_about_to_do,
         "inputs": {"file_path": file_path, "content_length": len(content), "create_dirs": create_dirs},
-        "outputs": {"success": success, "absolute_path": str(path.resolve()), "error": error_msg},
-        "duration": time.time() - start_time,
+        "outputs": {"success": success, "absolute_path": absolute_path, "error": error_msg},
+        "duration": (time.perf_counter_ns() - start_ns) / 1e9,
     }
 
-    session_data = append_event(session_name, event)
+    # The file or command has changed state on disk, so its record must be durable too
+    session_data = append_event(session_name, event, durable=True)
 
     if not success:
         raise ValueError(f"Failed to write file: {error_msg}")
 
     result = {
         "success": True,
-        "file_path": str(path.resolve()),
+        "file_path": absolute_path,
+        "session": session_data,
+    }
+    
+    return _clean_command_result(result)
+
+
+def copy_file(source_path: str, destination_path: str, current_task: str, summary_of_what_we_just_did: str, summary_of_what_we_about_to_do: str, create_dirs: bool = True) -> Dict[str, Any]:
+    """Copies a file for the active session without passing its content through Python strings."""
+    session_name = get_active_session_name()
+    if not session_name:
+        raise ValueError("No active session. Create or open a session first.")
+
+    # Wall-clock time for the event record; the integer nanosecond counter for the duration
+    timestamp = time.time()
+    start_ns = time.perf_counter_ns()
+    source = resolve_path(source_path)
+    destination = resolve_path(destination_path)
+    absolute_path = str(destination)
+
+    try:
+        if create_dirs:
+            os.makedirs(os.path.dirname(absolute_path), exist_ok=True)
+        bytes_copied = _copy_file_data(source, destination)
+        success = True
+        error_msg = ""
+    except Exception as e:
+        bytes_copied = 0
+        success = False
+        error_msg = str(e)
+
+    event: Event = {
+        "timestamp": timestamp,
+        "type": "copy",
+        "current_task": current_task,
+        "summary_of_what_we_just_did": summary_of_what_we_just_did,
+        "summary_of_what_we_about_to_do": summary_of_what_we_about_to_do,
+        "inputs": {"source_path": source_path, "destination_path": destination_path, "create_dirs": create_dirs},
+        "outputs": {
+            "success": success,
+            "source_absolute_path": str(source),
+            "absolute_path": absolute_path,
+            "bytes_copied": bytes_copied,
+            "error": error_msg,
+        },
+        "duration": (time.perf_counter_ns() - start_ns) / 1e9,
+    }
+
+    session_data = append_event(session_name, event, durable=True)
+
+    if not success:
+        raise ValueError(f"Failed to copy file: {error_msg}")
+
+    result = {
+        "success": True,
+        "file_path": absolute_path,
         "session": session_data,
     }
     
@@ -244,21 +587,13 @@ def run_command(command: str, current_task: str, summary_of_what_we_just_did: st
     if not session_name:
         raise ValueError("No active session. Create or open a session first.")
 
-    start_time = time.time()
-    cwd = working_directory or str(Path.cwd())
+    # Wall-clock time for the event record; the integer nanosecond counter for the duration
+    timestamp = time.time()
+    start_ns = time.perf_counter_ns()
+    cwd = working_directory or get_working_directory()
 
     try:
-        result = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-            cwd=cwd,
-        )
-        stdout = result.stdout
-        stderr = result.stderr
-        exitcode = result.returncode
+        stdout, stderr, exitcode, truncated = _run_shell_command(command, timeout, cwd)
         killed = False
         success = True
         error_msg = ""
@@ -266,6 +601,7 @@ def run_command(command: str, current_task: str, summary_of_what_we_just_did: st
         stdout = ""
         stderr = f"Command timed out after {timeout} seconds"
         exitcode = -1
+        truncated = False
         killed = True
         success = False
         error_msg = "timeout"
@@ -273,14 +609,15 @@ def run_command(command: str, current_task: str, summary_of_what_we_just_did: st
         stdout = ""
         stderr = str(e)
         exitcode = -1
+        truncated = False
         killed = False
         success = False
         error_msg = str(e)
 
-    duration = time.time() - start_time
+    duration = (time.perf_counter_ns() - start_ns) / 1e9
 
     event: Event = {
-        "timestamp": start_time,
+        "timestamp": timestamp,
         "type": "run",
         "current_task": current_task,
         "summary_of_what_we_just_did": summary_of_what_we_just_did,
@@ -291,13 +628,14 @@ def run_command(command: str, current_task: str, summary_of_what_we_just_did: st
             "stdout": stdout,
             "stderr": stderr,
             "exitcode": exitcode,
+            "truncated": truncated,
             "killed": killed,
             "error": error_msg
         },
         "duration": duration,
     }
 
-    session_data = append_event(session_name, event)
+    session_data = append_event(session_name, event, durable=True)
 
     result_dict = {
         "success": success,
@@ -306,6 +644,7 @@ def run_command(command: str, current_task: str, summary_of_what_we_just_did: st
         "stdout": stdout,
         "stderr": stderr,
         "exitcode": exitcode,
+        "truncated": truncated,
         "killed": killed,
         "duration": duration,
         "working_directory": cwd,
@@ -5,23 +5,29 @@ Simple History and Instructions management for DAZ Command MCP Server
 Manages a history.json file that tracks recent session activities.
 Manages an instructions.json file that contains session-specific instructions.
 Keeps under 32k characters by removing oldest entries when needed.
-Simple synchronous operation - no threads, no caching, just JSON files.
+All history.json writes (add_history_entry, record_user_request) run on the
+event pipeline thread in session_manager, so each read-modify-write sees the
+previous one; save_session_history replaces the file atomically via a temp file.
 """
 
 from __future__ import annotations
 
 import json
+import os
 import time
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 from .models import Event
-from .utils import get_session_dir
+from .utils import get_session_dir, ensure_dir
 
 
 # Maximum size for history.json in characters
 MAX_HISTORY_SIZE = 32 * 1024  # 32k characters
 
+# One reusable encoder for sizing entries (json.dumps builds a new one per call with ensure_ascii=False)
+_encode_entry = json.JSONEncoder(ensure_ascii=False).encode
+
 
 def get_history_path(session_name: str) -> Path:
     """Get the path to the history.json file for a session"""
@@ -56,14 +62,18 @@ def load_session_history(session_name: str) -> List[Dict[str, Any]]:
 
 
 def save_session_history(session_name: str, history: List[Dict[str, Any]]) -> None:
-    """Save history to history.json file"""
+    """Save history to history.json, writing a temp file and replacing the original atomically"""
     session_dir = get_session_dir(session_name)
-    session_dir.mkdir(parents=True, exist_ok=True)
+    ensure_dir(session_dir)
     
     history_path = get_history_path(session_name)
     
-    with history_path.open("w", encoding="utf-8") as f:
+    # Write a temporary file and swap it in, so a reader never sees a half-written history
+    # (load_session_history would read that as empty, and the next save would drop everything)
+    temp_path = history_path.with_name(history_path.name + ".tmp")
+    with temp_path.open("w", encoding="utf-8") as f:
         json.dump(history, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, history_path)
 
 
 def load_session_instructions(session_name: str) -> List[str]:
@@ -89,7 +99,7 @@ def load_session_instructions(session_name: str) -> List[str]:
 def save_session_instructions(session_name: str, instructions: List[str]) -> None:
     """Save instructions to instructions.json file"""
     session_dir = get_session_dir(session_name)
-    session_dir.mkdir(parents=True, exist_ok=True)
+    ensure_dir(session_dir)
     
     instructions_path = get_instructions_path(session_name)
     
@@ -159,29 +169,26 @@ def trim_history_to_size(history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     if not history:
         return history
     
-    # Calculate current size
-    history_json = json.dumps(history, ensure_ascii=False)
-    current_size = len(history_json)
+    # Serialize each entry once; the list's JSON size is "[" + ", ".join(entries) + "]"
+    entry_sizes = [len(_encode_entry(entry)) for entry in history]
+    current_size = 2 + sum(entry_sizes) + 2 * (len(entry_sizes) - 1)
     
     if current_size <= MAX_HISTORY_SIZE:
         return history  # Already under limit
     
-    # Remove entries from the beginning until we're under the limit
-    trimmed_history = history.copy()
-    
-    while len(trimmed_history) > 1:  # Keep at least one entry
-        trimmed_history.pop(0)  # Remove oldest entry
-        
-        # Check new size
-        trimmed_json = json.dumps(trimmed_history, ensure_ascii=False)
-        if len(trimmed_json) <= MAX_HISTORY_SIZE:
+    # Drop entries from the beginning until we're under the limit
+    start = 0
+    while start < len(history) - 1:  # Keep at least one entry
+        current_size -= entry_sizes[start] + 2
+        start += 1
+        if current_size <= MAX_HISTORY_SIZE:
             break
     
-    return trimmed_history
+    return history[start:]
 
 
 def add_history_entry(session_name: str, event: Event) -> None:
-    """Add a new history entry immediately (synchronous)"""
+    """Add a new history entry; runs on the event pipeline, which serializes every history.json write"""
     # Extract success from outputs
     success = False
     if event.get("outputs") and isinstance(event["outputs"], dict):
@@ -5,28 +5,226 @@ Models, types, and constants for DAZ Command MCP Server
 
 from __future__ import annotations
 
+import os
 import threading
-import queue
+from collections import deque
 from pathlib import Path
-from typing import Any, Dict, Optional, TypedDict
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, TypedDict
 
 
 # --- Constants ---
 # Comment: Sets the model once; if LM Studio isn't running or model missing, the summariser will log and skip.
 LLM_MODEL_NAME = "lm-studio:openai/gpt-oss-20b"
 
+# Comment: Maximum number of sessions summarized concurrently (DAZ_SUMMARY_CONCURRENCY, default 4); keep at or below the LLM server's parallelism.
+try:
+    SUMMARY_MAX_CONCURRENCY = max(1, int(os.environ.get("DAZ_SUMMARY_CONCURRENCY", "4")))
+except ValueError:
+    SUMMARY_MAX_CONCURRENCY = 4
+
+# Comment: A failed summary batch is retried this many times, backing off 1s, 2s, 4s, ... up to the cap (seconds).
+SUMMARY_MAX_TASK_RETRIES = 3
+SUMMARY_RETRY_BACKOFF_CAP = 60.0
+
+# Comment: Most summary tasks held in memory; past this the oldest pending task is dropped for each new one.
+SUMMARY_QUEUE_MAXSIZE = 1000
+
+# Comment: Set DAZ_LOG_FSYNC=1 to fdatasync session logs; appends arriving within the window (seconds) share one sync.
+LOG_FSYNC = os.environ.get("DAZ_LOG_FSYNC") == "1"
+LOG_GROUP_COMMIT_WINDOW = 0.002
+
 # Comment: Resolve script directory and sessions path.
 SCRIPT_DIR = Path(__file__).resolve().parent
 SESSIONS_DIR = SCRIPT_DIR.parent / "sessions"
 
 
-# --- Global State ---
-# Comment: Global state for active session selection and thread safety.
-_active_session_name_lock = threading.Lock()
-_active_session_name: Optional[str] = None
+# --- Summary Queue ---
+class SummaryQueue:
+    """
+    Pending summary tasks held in one FIFO deque per session, guarded by a single
+    condition variable, so a session's tasks can be batched without removing and
+    re-adding tasks that belong to other sessions.
+    
+    Producers never take the lock unless a consumer is parked: put() appends to a
+    deque inbox (atomic under the GIL) and consumers move inbox tasks into their
+    session deques while they hold the lock.
+    
+    With a maxsize, the queue applies drop-oldest backpressure: once full, each new
+    task evicts the oldest pending one, so a stalled LLM can't grow memory without bound.
+    """
+
+    def __init__(self, maxsize: int = 0) -> None:
+        self._maxsize = maxsize
+        self._dropped = 0
+        self._inbox: Deque[Dict[str, Any]] = deque()
+        self._sessions: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._in_flight: Set[str] = set()
+        lock = threading.RLock()
+        self._cv = threading.Condition(lock)
+        # Separate condition on the same lock for wait_empty(), so put()'s single notify always reaches a consumer
+        self._empty_cv = threading.Condition(lock)
+        self._size = 0
+        self._waiters = 0
+        self._closed = False
+
+    def put(self, item: Dict[str, Any]) -> bool:
+        """
+        Add a task to the inbox and wake the worker if it is waiting for work.
+        Returns True if the queue was full and its oldest pending task was dropped.
+        """
+        self._inbox.append(item)
+        dropped = False
+        if self._maxsize and self.qsize() > self._maxsize:
+            dropped = self._drop_oldest()
+        # Consumers register as waiters before their last inbox check, so a zero count here
+        # means any consumer about to wait will still see this task
+        if self._waiters:
+            with self._cv:
+                self._cv.notify()
+        return dropped
+
+    def _drop_oldest(self) -> bool:
+        """Evict one pending task, oldest first, from the session at the front of the rotation."""
+        with self._cv:
+            self._drain_inbox()
+            if self._size <= self._maxsize:
+                return False
+            for session_name, pending in self._sessions.items():
+                if pending:
+                    pending.popleft()
+                    if not pending:
+                        del self._sessions[session_name]
+                    self._size -= 1
+                    self._dropped += 1
+                    return True
+            return False
+
+    def dropped_count(self) -> int:
+        """Total tasks dropped because the queue was full."""
+        return self._dropped
+
+    def _drain_inbox(self) -> None:
+        """Move inbox tasks into their session deques; the lock must be held."""
+        inbox = self._inbox
+        while inbox:
+            item = inbox.popleft()
+            self._sessions.setdefault(item["session_name"], deque()).append(item)
+            self._size += 1
+
+    def qsize(self) -> int:
+        """Approximate number of pending tasks across all sessions."""
+        return self._size + len(self._inbox)
 
+    def empty(self) -> bool:
+        """True if no tasks are pending."""
+        return self._size == 0 and not self._inbox
+
+    def wait_empty(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until no tasks are pending, the timeout passes or the queue is closed (a closed queue
+        is never drained); returns whether it is empty.
+        """
+        with self._cv:
+            self._drain_inbox()
+            self._empty_cv.wait_for(lambda: self._closed or (self._size == 0 and not self._inbox), timeout)
+            return self._size == 0 and not self._inbox
+
+    def close(self) -> None:
+        """Stop handing out work; blocked and future next_session() and wait_empty() calls return."""
+        with self._cv:
+            self._closed = True
+            self._cv.notify_all()
+            self._empty_cv.notify_all()
+
+    def next_session(self) -> Optional[str]:
+        """
+        Block until a session that isn't already being processed has pending tasks,
+        mark it in flight and return its name, round-robin across sessions.
+        Returns None once the queue has been closed.
+        """
+        with self._cv:
+            while True:
+                self._drain_inbox()
+                if self._closed:
+                    return None
+                session_name = next((name for name in self._sessions if name not in self._in_flight), None)
+                if session_name is not None:
+                    break
+                self._waiters += 1
+                try:
+                    # Re-check after registering: a put() that saw no waiters has already reached the inbox
+                    if not self._inbox:
+                        self._cv.wait()
+                finally:
+                    self._waiters -= 1
+            # Move the session to the back so other sessions get the next turn
+            self._sessions[session_name] = self._sessions.pop(session_name)
+            self._in_flight.add(session_name)
+            return session_name
+
+    def has_waiting_sessions(self) -> bool:
+        """True if some session with pending tasks is not currently in flight."""
+        with self._cv:
+            self._drain_inbox()
+            return any(name not in self._in_flight for name in self._sessions)
+
+    def release_session(self, session_name: str) -> None:
+        """Mark a session as no longer in flight so its remaining tasks can be dispatched."""
+        with self._cv:
+            self._in_flight.discard(session_name)
+            self._cv.notify()
+
+    def pop_batch(self, session_name: str, max_tokens: int, estimate: Callable[[Dict[str, Any]], int]) -> List[Dict[str, Any]]:
+        """
+        Pop the oldest tasks for a session while their estimated tokens fit within max_tokens.
+        The first task is always taken so an oversized task cannot block its session.
+        
+        The session's whole deque is taken in one lock acquisition and the budget is applied
+        outside the lock; tasks that don't fit go back to the front. The caller must hold the
+        session in flight so no other worker touches its tasks meanwhile. Taken tasks stay
+        counted as pending until the split is done, so the queue never looks briefly empty.
+        """
+        with self._cv:
+            if self._closed:
+                return []
+            self._drain_inbox()
+            pending = self._sessions.pop(session_name, None)
+            if not pending:
+                return []
+        
+        batch = [pending.popleft()]
+        # A lone task is sent as-is; token estimation only matters when there is something to batch with it
+        if pending:
+            tokens = estimate(batch[0])
+            while pending:
+                item_tokens = estimate(pending[0])
+                if tokens + item_tokens > max_tokens:
+                    break
+                batch.append(pending.popleft())
+                tokens += item_tokens
+        
+        with self._cv:
+            if pending:
+                self._sessions.setdefault(session_name, deque()).extendleft(reversed(pending))
+                self._cv.notify()
+            self._size -= len(batch)
+            if self._size == 0:
+                self._empty_cv.notify_all()
+        return batch
+
+    def push_front(self, session_name: str, items: List[Dict[str, Any]]) -> None:
+        """Return tasks to the front of their session's deque, preserving their order."""
+        if not items:
+            return
+        with self._cv:
+            self._sessions.setdefault(session_name, deque()).extendleft(reversed(items))
+            self._size += len(items)
+            self._cv.notify()
+
+
+# --- Global State ---
 # Comment: In-memory queue and worker thread for asynchronous summarisation.
-_summary_queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+_summary_queue = SummaryQueue(SUMMARY_QUEUE_MAXSIZE)
 _summary_thread_started = False
 _summary_thread_started_lock = threading.Lock()
 
@@ -47,3 +245,5 @@ class Event(TypedDict, total=False):
     inputs: Dict[str, Any]
     outputs: Dict[str, Any]
     duration: float
+    input_summary: str  # Truncated inputs text; set instead of inputs on events queued for summarization
+    output_summary: str  # Truncated outputs text; set instead of outputs on events queued for summarization
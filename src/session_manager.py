@@ -5,43 +5,42 @@ Session management functionality for DAZ Command MCP Server
 
 from __future__ import annotations
 
+import os
 import shutil
 import sys
+import threading
 import time
-from pathlib import Path
-from typing import Any, Dict, List
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
 
 from .models import SESSIONS_DIR, Event
 from .utils import (
     ensure_sessions_dir, get_session_dir, sanitize_session_name,
     load_session_summary, save_session_summary, append_event_to_log,
-    append_error_to_log, get_active_session_name, set_active_session_name
+    append_error_to_log, get_active_session_name, set_active_session_name,
+    get_events_count, release_session_files, get_working_directory, read_session_summary_head
 )
 from .summary_worker import enqueue_summary
-from .history_manager import add_history_entry
+from .history_manager import add_history_entry, record_user_request
 
 
 def create_session_metadata(session_name: str) -> Dict[str, Any]:
     """Create session metadata dict for public view"""
     session_dir = get_session_dir(session_name)
     
-    # Count events by counting lines in event_log.jsonl
-    events_count = 0
-    log_path = session_dir / "event_log.jsonl"
-    if log_path.exists():
-        try:
-            with log_path.open("r", encoding="utf-8") as f:
-                events_count = sum(1 for _ in f)
-        except Exception:
-            events_count = 0
+    # Lines in event_log.jsonl, scanned once per session and then maintained by appends
+    events_count = get_events_count(session_name)
     
-    # Get creation and modification times
-    created_at = session_dir.stat().st_ctime if session_dir.exists() else time.time()
-    updated_at = session_dir.stat().st_mtime if session_dir.exists() else time.time()
+    # Get creation and modification times from a single stat call
+    try:
+        st = os.stat(session_dir)
+        created_at, updated_at = st.st_ctime, st.st_mtime
+    except FileNotFoundError:
+        created_at = updated_at = time.time()
     
-    # Get current directory from summary if available
-    summary = load_session_summary(session_name)
-    current_directory = str(Path.cwd())  # Default fallback
+    # Only the start of the summary is shown, so don't load (and cache) the whole file
+    summary = read_session_summary_head(session_name, 200)
+    current_directory = get_working_directory()  # Default fallback
     
     return {
         "id": sanitize_session_name(session_name),  # For compatibility
@@ -68,7 +67,7 @@ def create_session_record(name: str, description: str) -> Dict[str, Any]:
     session_dir.mkdir(parents=True, exist_ok=True)
     
     # Initialize summary with the description (the "why")
-    initial_summary = f"Session Purpose: {description}\n\nStarted at: {Path.cwd()}\n\nSession Log:\n"
+    initial_summary = f"Session Purpose: {description}\n\nStarted at: {get_working_directory()}\n\nSession Log:\n"
     save_session_summary(name, initial_summary)
     
     return create_session_metadata(name)
@@ -87,7 +86,9 @@ def rename_session(old_name: str, new_name: str) -> Dict[str, Any]:
     if new_session_dir.exists():
         raise ValueError(f"Session '{new_name}' already exists")
     
-    # Rename the directory
+    # Rename the directory (pending history updates, cached log writers and state still point at the old path)
+    wait_for_event_pipeline()
+    release_session_files(old_name)
     old_session_dir.rename(new_session_dir)
     
     # If this was the active session, update the active session name
@@ -115,7 +116,9 @@ def delete_session(session_name: str) -> Dict[str, Any]:
     timestamp = int(time.time())
     target_dir = deleted_sessions_dir / f"{sanitize_session_name(session_name)}_{timestamp}"
     
-    # Move the session directory
+    # Move the session directory (pending history updates, cached log writers and state still point at the old path)
+    wait_for_event_pipeline()
+    release_session_files(session_name)
     shutil.move(str(session_dir), str(target_dir))
     
     # If this was the active session, clear the active session
@@ -136,38 +139,86 @@ def list_session_views() -> List[Dict[str, Any]]:
     ensure_sessions_dir()
     out: List[Dict[str, Any]] = []
     
-    # Only list directories, not files
-    for item in sorted(SESSIONS_DIR.iterdir()):
-        if item.is_dir():
-            try:
-                out.append(create_session_metadata(item.name))
-            except Exception as e:
-                print(f"[mcp] skipping session dir {item.name}: {e}", file=sys.stderr)
+    # Only list directories, not files; scandir entries know their type without an extra stat
+    with os.scandir(SESSIONS_DIR) as entries:
+        names = sorted(entry.name for entry in entries if entry.is_dir())
+    
+    for name in names:
+        try:
+            out.append(create_session_metadata(name))
+        except Exception as e:
+            print(f"[mcp] skipping session dir {name}: {e}", file=sys.stderr)
     
     return out
 
 
-def append_event(session_name: str, event: Event) -> Dict[str, Any]:
-    """Appends an event, adds to history (sync), and triggers async summary update."""
+# History updates and summary enqueues for appended events run on one background thread, in
+# event order, so a tool call returns once its event is queued to the log
+_event_pipeline = ThreadPoolExecutor(max_workers=1, thread_name_prefix="event-pipeline")
+_event_pipeline_tail: Optional[Future] = None
+_event_pipeline_lock = threading.Lock()
+
+
+def wait_for_event_pipeline() -> None:
+    """Wait until every event appended so far has been added to history and queued for summary."""
+    tail = _event_pipeline_tail
+    if tail is not None:
+        # One worker runs tasks in submission order, so the last one finishing means all have
+        wait([tail])
+
+
+def _record_event(session_name: str, old_summary: str, event: Event) -> None:
+    """Pipeline task: add the event to history and queue its summary update."""
+    # Add to history with debugging
+    try:
+        print(f"[DEBUG] Adding history entry for session: {session_name}", file=sys.stderr)
+        add_history_entry(session_name, event)
+        print(f"[DEBUG] History entry added successfully", file=sys.stderr)
+    except Exception as history_error:
+        print(f"[ERROR] Failed to add history entry: {history_error}", file=sys.stderr)
+        import traceback
+        traceback.print_exc(file=sys.stderr)
+    
+    # Trigger async summary update (keep existing summary system)
+    try:
+        enqueue_summary(session_name, old_summary, event)
+    except Exception as e:
+        append_error_to_log(session_name, {
+            "timestamp": time.time(),
+            "type": "append_event_error",
+            "error": str(e),
+            "event": event
+        })
+
+
+def record_user_request_in_order(session_name: str, user_request: str) -> None:
+    """
+    Record a user request in history on the event pipeline, after the history entries of events
+    already appended, and wait for it. The pipeline is the only writer of history.json, so the
+    request can't race an event's history update and lose one of them.
+    """
+    global _event_pipeline_tail
+    with _event_pipeline_lock:
+        task = _event_pipeline_tail = _event_pipeline.submit(record_user_request, session_name, user_request)
+    # Re-raises anything record_user_request raised
+    task.result()
+
+
+def append_event(session_name: str, event: Event, durable: bool = False) -> Dict[str, Any]:
+    """
+    Appends an event, then hands the history entry and summary update to the event pipeline.
+    durable=True waits for the event log sync when DAZ_LOG_FSYNC is enabled.
+    """
+    global _event_pipeline_tail
     try:
         # Get old summary before appending event
         old_summary = load_session_summary(session_name)
         
         # Append event to log
-        append_event_to_log(session_name, event)
+        append_event_to_log(session_name, event, durable=durable)
         
-        # Add to history synchronously with debugging
-        try:
-            print(f"[DEBUG] Adding history entry for session: {session_name}", file=sys.stderr)
-            add_history_entry(session_name, event)
-            print(f"[DEBUG] History entry added successfully", file=sys.stderr)
-        except Exception as history_error:
-            print(f"[ERROR] Failed to add history entry: {history_error}", file=sys.stderr)
-            import traceback
-            traceback.print_exc(file=sys.stderr)
-        
-        # Trigger async summary update (keep existing summary system)
-        enqueue_summary(session_name, old_summary, event)
+        with _event_pipeline_lock:
+            _event_pipeline_tail = _event_pipeline.submit(_record_event, session_name, old_summary, event)
         
         return create_session_metadata(session_name)
     
@@ -8,24 +8,325 @@ It focuses on prompt creation, LLM interaction, and result processing.
 
 from __future__ import annotations
 
-import json
+import hashlib
+import importlib.util
+import math
 import sys
+import threading
 import time
 import re
-from typing import Any, Dict, List, Optional
+import sqlite3
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
-# Graceful dependency check - allow system to continue without LLM
-_dazllm_available = False
-try:
-    from dazllm import Llm
-    _dazllm_available = True
-except ImportError as e:
-    print(f"[summary-generator] dazllm module not available: {e}", file=sys.stderr)
+# Graceful dependency check - allow system to continue without LLM.
+# Only look the module up here; importing dazllm is deferred to SummaryGenerator.initialize().
+_dazllm_available = "dazllm" in sys.modules or importlib.util.find_spec("dazllm") is not None
+if not _dazllm_available:
+    print(f"[summary-generator] dazllm module not available", file=sys.stderr)
     print(f"[summary-generator] Summary generation will be disabled, but other functionality will continue", file=sys.stderr)
-    Llm = None
 
-from .models import LLM_MODEL_NAME, Event
-from .utils import truncate_with_indication
+# Optional tokenizer - without it token counts fall back to the ~4 chars/token heuristic
+_tiktoken_available = False
+try:
+    import tiktoken
+    _tiktoken_available = True
+except ImportError:
+    tiktoken = None
+
+from .models import LLM_MODEL_NAME, SESSIONS_DIR, Event
+from .utils import truncate_with_indication, dumps_json
+
+# Token counts keyed by (content hash, encoding name); bounded, oldest entries evicted first
+_TOKEN_COUNT_CACHE_SIZE = 4096
+
+# Texts longer than this are estimated from evenly spaced samples instead of fully tokenized
+_TOKEN_SAMPLE_THRESHOLD = 32768
+_TOKEN_SAMPLE_COUNT = 8
+_TOKEN_SAMPLE_SIZE = 1024
+_token_count_cache: Dict[Tuple[bytes, str], int] = {}
+_token_count_cache_lock = threading.Lock()
+
+# Successful LLM replies keyed by a hash of (model, prompt), so an identical prompt - a batch replayed
+# after a restart, or an unchanged summary fed the same events - is answered without an LLM call
+_RESPONSE_CACHE_PATH = SESSIONS_DIR / "llm_cache.sqlite3"
+_RESPONSE_CACHE_TTL = 7 * 24 * 3600.0
+_RESPONSE_CACHE_MAX_ENTRIES = 2000
+_RESPONSE_CACHE_PRUNE_EVERY = 100
+_response_cache: Optional[sqlite3.Connection] = None
+_response_cache_disabled = False
+_response_cache_stores = 0
+_response_cache_lock = threading.Lock()
+# The most recent (key, reply) stored, answered in-process without touching SQLite (or when it is disabled)
+_last_cached_response: Optional[Tuple[str, str]] = None
+
+
+def _response_cache_key(model_name: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{prompt}".encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _get_response_cache() -> Optional[sqlite3.Connection]:
+    """Open the response cache on first use (caller holds _response_cache_lock); None once it has failed."""
+    global _response_cache, _response_cache_disabled
+    if _response_cache is None and not _response_cache_disabled:
+        try:
+            _RESPONSE_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(str(_RESPONSE_CACHE_PATH), check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, response TEXT NOT NULL, ts REAL NOT NULL)"
+            )
+            connection.commit()
+            _response_cache = connection
+        except sqlite3.Error as e:
+            _response_cache_disabled = True
+            print(f"[summary-generator] LLM response cache disabled: {e}", file=sys.stderr)
+    return _response_cache
+
+
+def _lookup_cached_response(key: str) -> Optional[str]:
+    """Return the cached reply for key if it is present and younger than the TTL."""
+    last = _last_cached_response
+    if last is not None and last[0] == key:
+        return last[1]
+    with _response_cache_lock:
+        connection = _get_response_cache()
+        if connection is None:
+            return None
+        try:
+            row = connection.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND ts >= ?",
+                (key, time.time() - _RESPONSE_CACHE_TTL),
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"[summary-generator] LLM response cache lookup failed: {e}", file=sys.stderr)
+            return None
+    return row[0] if row else None
+
+
+def _store_cached_response(key: str, response: str) -> None:
+    """Cache a reply, pruning expired and least recent entries every _RESPONSE_CACHE_PRUNE_EVERY stores."""
+    global _response_cache_stores, _last_cached_response
+    _last_cached_response = (key, response)
+    with _response_cache_lock:
+        connection = _get_response_cache()
+        if connection is None:
+            return
+        try:
+            now = time.time()
+            connection.execute("INSERT OR REPLACE INTO llm_cache (key, response, ts) VALUES (?, ?, ?)", (key, response, now))
+            _response_cache_stores += 1
+            if _response_cache_stores % _RESPONSE_CACHE_PRUNE_EVERY == 0:
+                connection.execute("DELETE FROM llm_cache WHERE ts < ?", (now - _RESPONSE_CACHE_TTL,))
+                connection.execute(
+                    "DELETE FROM llm_cache WHERE key NOT IN (SELECT key FROM llm_cache ORDER BY ts DESC LIMIT ?)",
+                    (_RESPONSE_CACHE_MAX_ENTRIES,),
+                )
+            connection.commit()
+        except sqlite3.Error as e:
+            print(f"[summary-generator] LLM response cache store failed: {e}", file=sys.stderr)
+
+
+# Channel-formatted LLM replies, e.g. <|channel|>analysis<|message|>...<|end|><|start|>assistant<|channel|>final<|message|>...
+_FINAL_MESSAGE_RE = re.compile(r'<\|channel\|>final<\|message\|>(.*?)(?:<\|end\|>|$)', re.DOTALL)
+_ASSISTANT_FINAL_MESSAGE_RE = re.compile(r'<\|start\|>assistant<\|channel\|>final<\|message\|>(.*?)(?:<\|end\|>|$)', re.DOTALL)
+_CHANNEL_TAG_RE = re.compile(r'<\|[^>]+\|>')
+
+# First standalone number in a context length error, e.g. "Reached context length of 4096 tokens"
+_FIRST_NUMBER_RE = re.compile(r'\b(\d+)\b')
+
+
+# Static instruction text shared by every summary prompt; only the document and events vary per call.
+# Keeping it as one constant prefix means each batch reuses the same string and the server sees an identical prompt prefix.
+_SUMMARY_PROMPT_HEADER = (
+    "You are maintaining a PROJECT ARCHITECTURE DOCUMENT for a software repository. "
+    "This document serves as a technical reference for future developers working with this codebase. "
+    "It contains ONLY factual information about the repository structure, setup, and how to work with it.\\n\\n"
+    
+    "==== CRITICAL INSTRUCTIONS ====\\n"
+    "1. ARCHITECTURE ONLY: Document the repository structure, not development activities\\n"
+    "2. STATIC INFORMATION: Include only information that remains stable about the project\\n"
+    "3. NO HISTORY: Never include what was done, attempted, discovered, or tried\\n"
+    "4. NO PROCESS: Never include commands run, steps taken, or development activities\\n"
+    "5. VALIDATION REQUIRED: Check if new information contradicts existing facts\\n"
+    "6. CORRECTION MANDATED: Remove any existing information that is now proven incorrect\\n"
+    "7. FACTS ONLY: Only include information that is explicitly confirmed by the events\\n\\n"
+    
+    "==== WHAT TO INCLUDE ====\\n"
+    "• Repository location (absolute path)\\n"
+    "• Directory structure and file organization\\n"
+    "• Key executable files and entry points\\n"
+    "• Dependencies and requirements\\n"
+    "• Build/test/deployment procedures (if any exist)\\n"
+    "• Configuration files and their purposes\\n"
+    "• Technology stack and frameworks\\n"
+    "• Development environment setup requirements\\n"
+    "• Important file locations and their roles\\n"
+    "• Any constraints or special requirements\\n\\n"
+    
+    "==== WHAT TO NEVER INCLUDE ====\\n"
+    "• Development activities or work sessions\\n"
+    "• Commands that were executed\\n"
+    "• Troubleshooting steps or problem-solving\\n"
+    "• 'We discovered' or 'We found' statements\\n"
+    "• Current work, tasks in progress, or next steps\\n"
+    "• Timestamps or chronological information\\n"
+    "• Error messages or debugging information\\n"
+    "• Development process or methodology\\n"
+    "• Personal observations or recommendations\\n\\n"
+    
+    "==== VALIDATION PROCESS ====\\n"
+    "BEFORE writing the updated architecture document:\\n"
+    "1. Examine the new events for any factual information about the repository\\n"
+    "2. Check if this new information contradicts ANYTHING in the existing document\\n"
+    "3. If contradictions exist, REMOVE the incorrect information from the existing document\\n"
+    "4. Only add new information that is explicitly confirmed by file contents, directory listings, or configuration details\\n"
+    "5. Ensure all paths, file names, and technical details are accurate\\n\\n"
+    
+    "==== EXAMPLES ====\\n"
+    "GOOD: 'Repository located at /Volumes/T9/project/src'\\n"
+    "BAD: 'We navigated to /Volumes/T9/project/src and found the code'\\n\\n"
+    
+    "GOOD: 'Entry point: main.py (runs with python main.py)'\\n"
+    "BAD: 'Successfully ran main.py and it worked correctly'\\n\\n"
+    
+    "GOOD: 'Dependencies: fastmcp, dazllm (install via pip)'\\n"
+    "BAD: 'Installed the required dependencies and they are working'\\n\\n"
+)
+
+_SUMMARY_PROMPT_FOOTER = (
+    "Now perform the validation process and provide the updated architecture document. "
+    "Focus only on the repository structure and setup information. "
+    "Remove any incorrect information and add only confirmed facts.\\n\\n"
+    
+    "Updated Architecture Document:"
+)
+
+
+@lru_cache(maxsize=8)
+def _get_encoder(model_name: str) -> Optional[Any]:
+    """Resolve a tiktoken encoder for the model, or None if tokenization is unavailable."""
+    if not _tiktoken_available:
+        return None
+    try:
+        # Strip provider prefixes such as "lm-studio:openai/"
+        return tiktoken.encoding_for_model(model_name.rsplit("/", 1)[-1])
+    except KeyError:
+        pass
+    except Exception:
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def _count_tokens_cached(text: str, encoder: Any) -> int:
+    """Count tokens with the encoder, caching results by a content hash of the text."""
+    key = (hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest(), encoder.name)
+    with _token_count_cache_lock:
+        cached = _token_count_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    count = len(encoder.encode(text, disallowed_special=()))
+    with _token_count_cache_lock:
+        if len(_token_count_cache) >= _TOKEN_COUNT_CACHE_SIZE:
+            _token_count_cache.pop(next(iter(_token_count_cache)))
+        _token_count_cache[key] = count
+    return count
+
+
+def _estimate_tokens_sampled(text: str, encoder: Any) -> int:
+    """
+    Estimate tokens for a large text by tokenizing a few evenly spaced windows
+    and extrapolating their tokens-per-character ratio to the full length.
+    """
+    step = (len(text) - _TOKEN_SAMPLE_SIZE) // (_TOKEN_SAMPLE_COUNT - 1)
+    sample_chars = 0
+    sample_tokens = 0
+    for i in range(_TOKEN_SAMPLE_COUNT):
+        sample = text[i * step:i * step + _TOKEN_SAMPLE_SIZE]
+        sample_chars += len(sample)
+        sample_tokens += len(encoder.encode(sample, disallowed_special=()))
+    return int(len(text) * sample_tokens / sample_chars)
+
+
+def _stringify(value: Any) -> str:
+    """
+    Render an input/output value for the prompt: strings as-is, scalars as JSON text without
+    going through an encoder, and containers as compact JSON (orjson when installed).
+    """
+    if isinstance(value, str):
+        return value
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if value is None:
+        return "null"
+    value_type = type(value)
+    if value_type is int or (value_type is float and math.isfinite(value)):
+        return repr(value)
+    return dumps_json(value, indent=False)
+
+
+def _format_kv_block(values: Dict[str, Any], max_value_chars: int, keep_end: bool = False) -> Tuple[str, int]:
+    """
+    Render a dict as stripped "key: value" lines with a single join, values via _stringify.
+    Values longer than max_value_chars are cut to that many characters (their end if keep_end)
+    before joining, so a large output isn't copied in full only to be truncated afterwards;
+    the first/last max_value_chars of the block are the same either way.
+    
+    Returns:
+        Tuple of (text, length the block would have had with no values cut)
+    """
+    lines = []
+    cut_chars = 0
+    for key, value in values.items():
+        text = _stringify(value)
+        if len(text) > max_value_chars:
+            cut_chars += len(text) - max_value_chars
+            text = text[-max_value_chars:] if keep_end else text[:max_value_chars]
+        lines.append(f"{key}: {text}")
+    block = "\n".join(lines).strip()
+    return block, len(block) + cut_chars
+
+
+def summarize_event_details(event: Event) -> Tuple[str, str]:
+    """
+    Render an event's inputs and outputs as "key: value" lines, truncated to the 256
+    characters the prompt uses (inputs keep their start, outputs their end).
+    
+    Returns:
+        Tuple of (input_summary, output_summary)
+    """
+    # Prepare input and output text for this event
+    input_text = ""
+    output_text = ""
+    input_length = output_length = 0
+    
+    try:
+        if event.get("inputs"):
+            input_text, input_length = _format_kv_block(event["inputs"], 256)
+        
+        if event.get("outputs"):
+            output_text, output_length = _format_kv_block(event["outputs"], 256, keep_end=True)
+    except Exception as e:
+        input_text = f"Error processing inputs: {e}"
+        output_text = f"Error processing outputs: {e}"
+        input_length, output_length = len(input_text), len(output_text)
+    
+    # Truncate for this event, reporting the full size of anything cut while formatting
+    try:
+        input_summary = truncate_with_indication(input_text, 256, from_end=False, original_length=input_length)
+        output_summary = truncate_with_indication(output_text, 256, from_end=True, original_length=output_length)
+    except Exception:
+        input_summary = input_text[:256] + "..." if len(input_text) > 256 else input_text
+        output_summary = output_text[:256] + "..." if len(output_text) > 256 else output_text
+    
+    return input_summary, output_summary
 
 
 class SummaryGenerator:
@@ -41,7 +342,8 @@ class SummaryGenerator:
     
     def initialize(self) -> bool:
         """
-        Initialize the LLM connection and test it.
+        Initialize the LLM connection. No test prompt is sent: the first real summary call
+        surfaces any connection problem (test_llm_connection() checks explicitly).
         
         Returns:
             True if initialization succeeded, False otherwise.
@@ -54,6 +356,15 @@ class SummaryGenerator:
             self._initialized = False
             return False
             
+        try:
+            from dazllm import Llm
+        except ImportError as e:
+            # Installed but unimportable (e.g. a broken dependency): disable summaries, don't fail startup
+            self._llm_available = False
+            self._init_error = f"dazllm module could not be imported - LLM functionality disabled: {e}"
+            self._initialized = False
+            return False
+
         try:
             self._llm = Llm.model_named(self.model_name)
             if self._llm is None:
@@ -61,14 +372,6 @@ class SummaryGenerator:
                 self._initialized = False
                 return False
             
-            # Test the LLM with a simple query to ensure it's working
-            test_response = self._llm.chat("Hello, please respond with 'OK' if you are working.")
-            
-            if test_response is None or len(test_response.strip()) == 0:
-                self._init_error = f"LLM test failed - None or empty response from model '{self.model_name}'"
-                self._initialized = False
-                return False
-            
             self._initialized = True
             self._init_error = None
             return True
@@ -93,12 +396,19 @@ class SummaryGenerator:
         """Check if LLM functionality is available at all."""
         return self._llm_available
     
-    def estimate_tokens(self, text: str) -> int:
+    def estimate_tokens(self, text: str, model_name: Optional[str] = None) -> int:
         """
         Estimate token count for text.
-        Rule of thumb: ~4 characters per token for English text.
+        Uses the model's tiktoken encoding when available (cached by content hash,
+        sampled for very large texts), otherwise the rule of thumb: ~4 characters
+        per token for English text.
         """
-        return len(text) // 4
+        encoder = _get_encoder(model_name or self.model_name)
+        if encoder is None:
+            return len(text) // 4
+        if len(text) > _TOKEN_SAMPLE_THRESHOLD:
+            return _estimate_tokens_sampled(text, encoder)
+        return _count_tokens_cached(text, encoder)
     
     def extract_context_length_from_error(self, error_message: str) -> Optional[int]:
         """
@@ -107,14 +417,9 @@ class SummaryGenerator:
         Example error: "Reached context length of 4096 tokens with model..."
         Returns: 4096
         """
-        try:
-            # Look for the first number in the error message
-            match = re.search(r'\b(\d+)\b', error_message)
-            if match:
-                return int(match.group(1))
-        except Exception:
-            pass
-        return None
+        # Look for the first number in the error message
+        match = _FIRST_NUMBER_RE.search(error_message)
+        return int(match.group(1)) if match else None
     
     def clean_llm_response(self, response: str) -> str:
         """
@@ -129,8 +434,7 @@ class SummaryGenerator:
             return response
         
         # Look for the final message pattern
-        final_pattern = r'<\|channel\|>final<\|message\|>(.*?)(?:<\|end\|>|$)'
-        match = re.search(final_pattern, response, re.DOTALL)
+        match = _FINAL_MESSAGE_RE.search(response)
         
         if match:
             # Extract just the final message content
@@ -138,8 +442,7 @@ class SummaryGenerator:
             return cleaned
         
         # If no channel tags found, look for assistant response pattern
-        assistant_pattern = r'<\|start\|>assistant<\|channel\|>final<\|message\|>(.*?)(?:<\|end\|>|$)'
-        match = re.search(assistant_pattern, response, re.DOTALL)
+        match = _ASSISTANT_FINAL_MESSAGE_RE.search(response)
         
         if match:
             cleaned = match.group(1).strip()
@@ -147,7 +450,7 @@ class SummaryGenerator:
         
         # If no patterns match, try to remove any channel tags that might be present
         # Remove channel control tags
-        cleaned = re.sub(r'<\|[^>]+\|>', '', response)
+        cleaned = _CHANNEL_TAG_RE.sub('', response)
         cleaned = cleaned.strip()
         
         # If the cleaned version is significantly shorter, maybe the original was better
@@ -158,58 +461,41 @@ class SummaryGenerator:
     
     def format_event_for_prompt(self, event: Event) -> str:
         """Format a single event for inclusion in the LLM prompt."""
-        # Prepare input and output text for this event
-        input_text = ""
-        output_text = ""
-        
-        try:
-            if event.get("inputs"):
-                for key, value in event["inputs"].items():
-                    if isinstance(value, str):
-                        input_text += f"{key}: {value}\n"
-                    else:
-                        input_text += f"{key}: {json.dumps(value)}\n"
-            
-            if event.get("outputs"):
-                for key, value in event["outputs"].items():
-                    if isinstance(value, str):
-                        output_text += f"{key}: {value}\n"
-                    else:
-                        output_text += f"{key}: {json.dumps(value)}\n"
-        except Exception as e:
-            input_text = f"Error processing inputs: {e}"
-            output_text = f"Error processing outputs: {e}"
-        
-        # Truncate for this event
-        try:
-            input_summary = truncate_with_indication(input_text.strip(), 256, from_end=False)
-            output_summary = truncate_with_indication(output_text.strip(), 256, from_end=True)
-        except Exception:
-            input_summary = input_text[:256] + "..." if len(input_text) > 256 else input_text
-            output_summary = output_text[:256] + "..." if len(output_text) > 256 else output_text
+        # Queued events carry their details pre-truncated; format raw events on the spot
+        if "input_summary" in event:
+            input_summary = event["input_summary"]
+            output_summary = event.get("output_summary", "")
+        else:
+            input_summary, output_summary = summarize_event_details(event)
         
-        # Build the purpose/context from the Event structure
+        # Build the purpose/context from the Event structure, looking each field up once
+        current_task = event.get("current_task")
+        just_did = event.get("summary_of_what_we_just_did")
+        about_to_do = event.get("summary_of_what_we_about_to_do")
         purpose_parts = []
         
         # Add current task
-        if event.get("current_task"):
-            purpose_parts.append(f"Task: {event['current_task']}")
+        if current_task:
+            purpose_parts.append(f"Task: {current_task}")
         
         # Add what was just done
-        if event.get("summary_of_what_we_just_did"):
-            purpose_parts.append(f"Just did: {event['summary_of_what_we_just_did']}")
+        if just_did:
+            purpose_parts.append(f"Just did: {just_did}")
         
         # Add what's about to be done
-        if event.get("summary_of_what_we_about_to_do"):
-            purpose_parts.append(f"About to do: {event['summary_of_what_we_about_to_do']}")
+        if about_to_do:
+            purpose_parts.append(f"About to do: {about_to_do}")
         
         # Join the purpose parts or use a fallback
         purpose_text = " | ".join(purpose_parts) if purpose_parts else "No context provided"
         
+        # Only read the clock for events that arrive without a timestamp
+        timestamp = event["timestamp"] if "timestamp" in event else time.time()
+        
         return f"""
   Type: {event.get('type', '')}
   Purpose: {purpose_text}
-  Timestamp: {event.get('timestamp', time.time())}
+  Timestamp: {timestamp}
   Duration: {event.get('duration', 0)}s
   Input Details: {input_summary}
   Output Details: {output_summary}
@@ -217,86 +503,21 @@ class SummaryGenerator:
     
     def format_batched_events(self, events_data: List[Dict[str, Any]]) -> str:
         """Format multiple events into a single text block for the LLM."""
-        if not events_data:
-            return ""
-        
-        formatted_events = []
-        
-        for i, item in enumerate(events_data, 1):
-            event = item["event"]
-            event_block = f"EVENT {i}:{self.format_event_for_prompt(event)}"
-            formatted_events.append(event_block)
-        
-        return "\n".join(formatted_events)
+        # Build every block up front and join once, rather than growing a string per event
+        return "\n".join([
+            f"EVENT {i}:{self.format_event_for_prompt(item['event'])}"
+            for i, item in enumerate(events_data, 1)
+        ])
     
     def create_summary_prompt(self, old_summary: str, events_text: str) -> str:
         """Create the LLM prompt for generating a repository architecture summary."""
         return (
-            "You are maintaining a PROJECT ARCHITECTURE DOCUMENT for a software repository. "
-            "This document serves as a technical reference for future developers working with this codebase. "
-            "It contains ONLY factual information about the repository structure, setup, and how to work with it.\\n\\n"
-            
-            "==== CRITICAL INSTRUCTIONS ====\\n"
-            "1. ARCHITECTURE ONLY: Document the repository structure, not development activities\\n"
-            "2. STATIC INFORMATION: Include only information that remains stable about the project\\n"
-            "3. NO HISTORY: Never include what was done, attempted, discovered, or tried\\n"
-            "4. NO PROCESS: Never include commands run, steps taken, or development activities\\n"
-            "5. VALIDATION REQUIRED: Check if new information contradicts existing facts\\n"
-            "6. CORRECTION MANDATED: Remove any existing information that is now proven incorrect\\n"
-            "7. FACTS ONLY: Only include information that is explicitly confirmed by the events\\n\\n"
-            
-            "==== WHAT TO INCLUDE ====\\n"
-            "• Repository location (absolute path)\\n"
-            "• Directory structure and file organization\\n"
-            "• Key executable files and entry points\\n"
-            "• Dependencies and requirements\\n"
-            "• Build/test/deployment procedures (if any exist)\\n"
-            "• Configuration files and their purposes\\n"
-            "• Technology stack and frameworks\\n"
-            "• Development environment setup requirements\\n"
-            "• Important file locations and their roles\\n"
-            "• Any constraints or special requirements\\n\\n"
-            
-            "==== WHAT TO NEVER INCLUDE ====\\n"
-            "• Development activities or work sessions\\n"
-            "• Commands that were executed\\n"
-            "• Troubleshooting steps or problem-solving\\n"
-            "• 'We discovered' or 'We found' statements\\n"
-            "• Current work, tasks in progress, or next steps\\n"
-            "• Timestamps or chronological information\\n"
-            "• Error messages or debugging information\\n"
-            "• Development process or methodology\\n"
-            "• Personal observations or recommendations\\n\\n"
-            
-            "==== VALIDATION PROCESS ====\\n"
-            "BEFORE writing the updated architecture document:\\n"
-            "1. Examine the new events for any factual information about the repository\\n"
-            "2. Check if this new information contradicts ANYTHING in the existing document\\n"
-            "3. If contradictions exist, REMOVE the incorrect information from the existing document\\n"
-            "4. Only add new information that is explicitly confirmed by file contents, directory listings, or configuration details\\n"
-            "5. Ensure all paths, file names, and technical details are accurate\\n\\n"
-            
-            "==== EXAMPLES ====\\n"
-            "GOOD: 'Repository located at /Volumes/T9/project/src'\\n"
-            "BAD: 'We navigated to /Volumes/T9/project/src and found the code'\\n\\n"
-            
-            "GOOD: 'Entry point: main.py (runs with python main.py)'\\n"
-            "BAD: 'Successfully ran main.py and it worked correctly'\\n\\n"
-            
-            "GOOD: 'Dependencies: fastmcp, dazllm (install via pip)'\\n"
-            "BAD: 'Installed the required dependencies and they are working'\\n\\n"
-            
+            f"{_SUMMARY_PROMPT_HEADER}"
             f"==== CURRENT ARCHITECTURE DOCUMENT ====\\n"
             f"{old_summary}\\n\\n"
-            
             f"==== NEW REPOSITORY INFORMATION ====\\n"
             f"{events_text}\\n\\n"
-            
-            "Now perform the validation process and provide the updated architecture document. "
-            "Focus only on the repository structure and setup information. "
-            "Remove any incorrect information and add only confirmed facts.\\n\\n"
-            
-            "Updated Architecture Document:"
+            f"{_SUMMARY_PROMPT_FOOTER}"
         )
     
     def generate_summary(
@@ -343,6 +564,18 @@ class SummaryGenerator:
                 "token_estimate": 0
             }
         
+        if not events_data:
+            # Nothing new to fold in: the summary stands as it is
+            return {
+                "success": True,
+                "summary": old_summary.strip(),
+                "error": None,
+                "prompt": "",
+                "response": "",
+                "duration": 0.0,
+                "token_estimate": 0
+            }
+        
         start_time = time.time()
         
         try:
@@ -355,8 +588,12 @@ class SummaryGenerator:
             # Estimate tokens
             token_estimate = self.estimate_tokens(prompt)
             
-            # Call the LLM
-            response = self._llm.chat(prompt)
+            # Call the LLM, unless this exact prompt has already been answered
+            cache_key = _response_cache_key(self.model_name, prompt)
+            response = _lookup_cached_response(cache_key)
+            from_cache = response is not None
+            if not from_cache:
+                response = self._llm.chat(prompt)
             
             # Check for None response
             if response is None:
@@ -386,6 +623,9 @@ class SummaryGenerator:
                     "token_estimate": token_estimate
                 }
             
+            if not from_cache:
+                _store_cached_response(cache_key, response)
+            
             return {
                 "success": True,
                 "summary": new_summary,
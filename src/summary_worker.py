@@ -6,25 +6,38 @@ Now uses the separated SummaryGenerator for LLM logic while handling worker mana
 
 from __future__ import annotations
 
-import json
+import re
 import sys
 import time
 import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 from .models import (
-    LLM_MODEL_NAME, _summary_queue, _summary_thread_started,
-    _summary_thread_started_lock, _summary_worker_init_event,
+    LLM_MODEL_NAME, SUMMARY_MAX_CONCURRENCY, SUMMARY_MAX_TASK_RETRIES, SUMMARY_RETRY_BACKOFF_CAP,
+    _summary_queue, _summary_thread_started, _summary_thread_started_lock, _summary_worker_init_event,
     _summary_worker_init_success, _summary_worker_init_error, Event
 )
-from .utils import save_session_summary, get_session_dir
-from .summary_generator import SummaryGenerator, _dazllm_available
+from .utils import load_session_summary, save_session_summary, append_llm_interaction_to_log, append_error_to_log
+from .summary_generator import SummaryGenerator, summarize_event_details, _dazllm_available
 
-# Global token limit management
+# Global token limit management; reads are a plain (GIL-atomic) load, the lock only serializes updates
 _current_token_limit = 30000  # Default starting limit
 _token_limit_lock = threading.Lock()
 
+# Detects an LLM context length error without lowercasing a possibly long error message, capturing
+# the number that follows (if any) in the same scan, e.g. "Reached context length of 4096 tokens"
+_CONTEXT_LENGTH_ERROR_RE = re.compile(r"context\s+length(?:\D*?(\d+))?", re.IGNORECASE)
+
+# Backoff between retries when the dispatch loop fails to take a session from the queue (seconds)
+_DISPATCH_RETRY_BASE_DELAY = 0.01
+_DISPATCH_RETRY_BACKOFF_CAP = 5.0
+
+# Limits how many session batches are being summarized at once
+_summary_slots = threading.BoundedSemaphore(SUMMARY_MAX_CONCURRENCY)
+
 # Global summary generator instance
 _summary_generator = None
 _generator_lock = threading.Lock()
@@ -36,8 +49,7 @@ _summary_worker_should_start = _dazllm_available
 
 def get_current_token_limit() -> int:
     """Get the current dynamic token limit"""
-    with _token_limit_lock:
-        return _current_token_limit
+    return _current_token_limit
 
 
 def update_token_limit(new_limit: int) -> None:
@@ -81,25 +93,23 @@ def wait_for_summary_queue_empty(timeout: float = 30.0) -> bool:
         timeout: Maximum time to wait in seconds
         
     Returns:
-        True if queue became empty within timeout, False otherwise
+        True if queue became empty within timeout, False otherwise (including when
+        the worker has been shut down with tasks still pending)
     """
     if not _summary_worker_should_start:
         return True  # No queue to wait for if no worker
-        
-    start_time = time.time()
     
-    while time.time() - start_time < timeout:
-        if is_summary_queue_empty():
-            return True
-        time.sleep(0.5)  # Check every 500ms
-    
-    return False
+    # Woken by the worker as soon as it takes the last pending task, instead of polling
+    return _summary_queue.wait_empty(timeout)
 
 
-def handle_context_length_error(error_message: str, session_name: str) -> bool:
+def handle_context_length_error(error_message: str, session_name: str, context_length: Optional[int] = None) -> bool:
     """
     Handle a context length error by adjusting the token limit.
     
+    context_length is the length already parsed from the message, if the caller has it;
+    otherwise it is extracted from error_message.
+    
     Returns True if the limit was adjusted, False otherwise.
     """
     try:
@@ -108,7 +118,8 @@ def handle_context_length_error(error_message: str, session_name: str) -> bool:
         if _summary_generator is None:
             return False
             
-        context_length = _summary_generator.extract_context_length_from_error(error_message)
+        if context_length is None:
+            context_length = _summary_generator.extract_context_length_from_error(error_message)
         if context_length is None:
             print(f"[summary-worker] could not extract context length from error: {error_message}", file=sys.stderr)
             return False
@@ -147,10 +158,6 @@ def handle_context_length_error(error_message: str, session_name: str) -> bool:
 def log_llm_interaction(session_name: str, prompt: str, response: str, duration: float, error: Optional[str] = None) -> None:
     """Log LLM interaction to session's llm_summary.jsonl file"""
     try:
-        session_dir = get_session_dir(session_name)
-        session_dir.mkdir(parents=True, exist_ok=True)
-        llm_log_path = session_dir / "llm_summary.jsonl"
-        
         log_entry = {
             "timestamp": time.time(),
             "prompt": prompt,
@@ -164,10 +171,8 @@ def log_llm_interaction(session_name: str, prompt: str, response: str, duration:
             "token_limit": get_current_token_limit()
         }
         
-        # Append as JSON line
-        with llm_log_path.open("a", encoding="utf-8") as f:
-            json.dump(log_entry, f, ensure_ascii=False)
-            f.write("\n")
+        # Queued to the session log journal, which keeps the file open between appends
+        append_llm_interaction_to_log(session_name, log_entry)
             
     except Exception as e:
         log_error(session_name, "log_llm_interaction", f"failed to log LLM interaction: {e}")
@@ -176,10 +181,6 @@ def log_llm_interaction(session_name: str, prompt: str, response: str, duration:
 def log_error(session_name: str, function_name: str, error_message: str, extra_data: Optional[Dict[str, Any]] = None) -> None:
     """Log error to session's errors.jsonl file"""
     try:
-        session_dir = get_session_dir(session_name)
-        session_dir.mkdir(parents=True, exist_ok=True)
-        errors_log_path = session_dir / "errors.jsonl"
-        
         error_entry = {
             "timestamp": time.time(),
             "function": function_name,
@@ -189,10 +190,8 @@ def log_error(session_name: str, function_name: str, error_message: str, extra_d
             "token_limit": get_current_token_limit()
         }
         
-        # Append as JSON line
-        with errors_log_path.open("a", encoding="utf-8") as f:
-            json.dump(error_entry, f, ensure_ascii=False)
-            f.write("\n")
+        # Queued to the session log journal, which keeps the file open between appends
+        append_error_to_log(session_name, error_entry)
             
     except Exception as e:
         # Last resort - print to stderr if we can't even log the error
@@ -200,6 +199,25 @@ def log_error(session_name: str, function_name: str, error_message: str, extra_d
         print(f"[error-log] Original error - {function_name}: {error_message}", file=sys.stderr)
 
 
+# Event fields carried into the summary queue alongside the pre-truncated input/output text
+_QUEUED_EVENT_FIELDS = (
+    "timestamp", "type", "current_task", "summary_of_what_we_just_did",
+    "summary_of_what_we_about_to_do", "duration",
+)
+
+
+# Event types that tell the summary nothing when they fail: a path that wasn't there was never documented
+_SKIP_FAILED_EVENT_TYPES = frozenset({"cd", "read"})
+
+
+def _is_trivial_event(event: Event) -> bool:
+    """True for events that can't add to the architecture document, so they aren't worth an LLM call."""
+    if event.get("type") not in _SKIP_FAILED_EVENT_TYPES:
+        return False
+    outputs = event.get("outputs")
+    return isinstance(outputs, dict) and outputs.get("success") is False
+
+
 def enqueue_summary(session_name: str, old_summary: str, event: Event) -> None:
     """Enqueue a summary update task"""
     # Complete no-op if summary worker shouldn't exist
@@ -209,14 +227,30 @@ def enqueue_summary(session_name: str, old_summary: str, event: Event) -> None:
     # Only enqueue if summary system is available
     if not _summary_system_available:
         return
+    
+    if _is_trivial_event(event):
+        return
         
     try:
+        # Queue a compact copy of the event: its inputs/outputs are reduced to the truncated text
+        # the prompt will use, so large outputs aren't held in memory while the task waits
+        input_summary, output_summary = summarize_event_details(event)
+        queued_event: Event = {key: event[key] for key in _QUEUED_EVENT_FIELDS if key in event}
+        queued_event["input_summary"] = input_summary
+        queued_event["output_summary"] = output_summary
+        
         payload = {
             "session_name": session_name,
             "old_summary": old_summary,
-            "event": event,
+            "event": queued_event,
+            "retries": 0,
         }
-        _summary_queue.put(payload)
+        payload["_estimated_tokens"] = _compute_item_tokens(old_summary, queued_event)
+        if _summary_queue.put(payload):
+            dropped = _summary_queue.dropped_count()
+            # Report the first drop and then every hundredth, rather than once per event
+            if dropped == 1 or dropped % 100 == 0:
+                print(f"[summary-worker] summary queue full - dropped {dropped} oldest pending events so far", file=sys.stderr)
     except Exception as e:
         log_error(session_name, "enqueue_summary", f"failed to enqueue summary: {e}")
 
@@ -224,20 +258,45 @@ def enqueue_summary(session_name: str, old_summary: str, event: Event) -> None:
 def requeue_items(items: List[Dict[str, Any]]) -> None:
     """
     Re-queue items that couldn't be processed due to token limits.
-    Items are put back in reverse order to maintain the original processing order.
+    Items go back to the front of their session's queue in their original processing order.
     """
+    if not items:
+        return
     try:
-        for item in reversed(items):
-            _summary_queue.put(item)
-        print(f"[summary-worker] re-queued {len(items)} items due to token limit adjustment", file=sys.stderr)
+        _summary_queue.push_front(items[0]["session_name"], items)
+        print(f"[summary-worker] re-queued {len(items)} items", file=sys.stderr)
     except Exception as e:
         print(f"[summary-worker] failed to re-queue items: {e}", file=sys.stderr)
 
 
+def _compute_item_tokens(old_summary: str, event: Event) -> int:
+    """Estimate the prompt tokens a queued event (with its summary) will contribute to a batch."""
+    # Rough token estimation for the event content (queued events carry pre-truncated details),
+    # plus the new Event structure fields for context
+    event_text = "".join((
+        event.get("input_summary", ""), event.get("output_summary", ""),
+        event.get("current_task", ""), event.get("summary_of_what_we_just_did", ""),
+        event.get("summary_of_what_we_about_to_do", ""), event.get("type", ""),
+    ))
+    generator = _summary_generator
+    if generator is None:
+        # Fallback estimation
+        return (len(old_summary) + len(event_text)) // 4
+    # Counted separately so the summary, identical across a session's queued events, hits the token cache
+    return generator.estimate_tokens(old_summary) + generator.estimate_tokens(event_text)
+
+
+def _estimate_item_tokens(item: Dict[str, Any]) -> int:
+    """Token estimate for a queued item, computed once when it was enqueued."""
+    tokens = item.get("_estimated_tokens")
+    if tokens is None:
+        tokens = item["_estimated_tokens"] = _compute_item_tokens(item["old_summary"], item["event"])
+    return tokens
+
+
 def peek_queue_for_same_session(session_name: str, max_tokens: Optional[int] = None) -> List[Dict[str, Any]]:
     """
-    Peek at the queue and collect additional items for the same session 
-    that will fit within the token limit.
+    Take the oldest queued items for a session that fit within the token limit.
     
     Returns a list of queue items that should be batched together.
     """
@@ -245,70 +304,12 @@ def peek_queue_for_same_session(session_name: str, max_tokens: Optional[int] = N
         max_tokens = get_current_token_limit()
     
     batched_items = []
-    estimated_tokens = 0
-    
-    # We need to peek at items without removing them initially
-    # Since queue.Queue doesn't have a peek method, we'll collect items
-    # and put back any we can't use
-    items_to_put_back = []
-    
     try:
-        while not _summary_queue.empty():
-            try:
-                # Get item with very short timeout to avoid blocking
-                item = _summary_queue.get_nowait()
-            except:
-                break
-                
-            # If it's not for the same session, put it back and stop
-            if item["session_name"] != session_name:
-                items_to_put_back.append(item)
-                break
-            
-            # Estimate tokens for this item using the generator's method
-            global _summary_generator
-            if _summary_generator is None:
-                # Fallback estimation
-                item_tokens = len(json.dumps(item)) // 4
-            else:
-                event = item["event"]
-                old_summary = item["old_summary"]
-                
-                # Rough token estimation for the event content
-                event_text = ""
-                if event.get("inputs"):
-                    event_text += json.dumps(event["inputs"])
-                if event.get("outputs"):
-                    event_text += json.dumps(event["outputs"])
-                
-                # Use the new Event structure fields for context
-                event_text += event.get("current_task", "")
-                event_text += event.get("summary_of_what_we_just_did", "")
-                event_text += event.get("summary_of_what_we_about_to_do", "")
-                event_text += event.get("type", "")
-                
-                item_tokens = _summary_generator.estimate_tokens(old_summary + event_text)
-            
-            # If adding this item would exceed our limit, put it back and stop
-            if estimated_tokens + item_tokens > max_tokens:
-                items_to_put_back.append(item)
-                break
-            
-            # Add to batch
-            batched_items.append(item)
-            estimated_tokens += item_tokens
-            
-            # Mark this item as done since we're consuming it
-            _summary_queue.task_done()
-            
+        batched_items = _summary_queue.pop_batch(session_name, max_tokens, _estimate_item_tokens)
     except Exception as e:
         print(f"[summary-worker] error while batching: {e}", file=sys.stderr)
     
-    # Put back any items we couldn't use
-    for item in reversed(items_to_put_back):  # Reverse to maintain order
-        _summary_queue.put(item)
-    
-    print(f"[summary-worker] batched {len(batched_items)} items for session {session_name} (~{estimated_tokens} tokens, limit: {max_tokens})", file=sys.stderr)
+    print(f"[summary-worker] batched {len(batched_items)} items for session {session_name} (limit: {max_tokens})", file=sys.stderr)
     return batched_items
 
 
@@ -319,72 +320,42 @@ def get_summary_generator() -> Optional[SummaryGenerator]:
         return _summary_generator
 
 
-def _summary_worker() -> None:
-    """Background worker that consumes the queue and updates session summaries; robust to errors."""
-    global _summary_worker_init_success, _summary_worker_init_error, _summary_generator, _summary_system_available
-    
-    print(f"[summary-worker] starting background thread with Python: {sys.executable}", file=sys.stderr)
-    
-    # Initialize the summary generator
-    try:
-        with _generator_lock:
-            _summary_generator = SummaryGenerator(LLM_MODEL_NAME)
-        
-        # Try to initialize the LLM
-        init_success = _summary_generator.initialize()
-        
-        if not init_success:
-            error_msg = _summary_generator.init_error or "Unknown initialization error"
-            print(f"[summary-worker] {error_msg}", file=sys.stderr)
-            _summary_worker_init_success = False
-            _summary_worker_init_error = error_msg
-            _summary_worker_init_event.set()
-            return
-        
-        # Signal successful initialization
-        print(f"[summary-worker] LLM successfully initialized", file=sys.stderr)
-        _summary_worker_init_success = True
-        _summary_worker_init_error = None
-        _summary_system_available = True
-        _summary_worker_init_event.set()
-        
-    except Exception as e:
-        error_msg = f"Unexpected error during LLM initialization: {e}"
-        print(f"[summary-worker] {error_msg}", file=sys.stderr)
-        _summary_worker_init_success = False
-        _summary_worker_init_error = error_msg
-        _summary_worker_init_event.set()
+def _retry_after_backoff(session_name: str, batched_items: List[Dict[str, Any]], reason: str) -> None:
+    """
+    Re-queue a failed batch after an exponential backoff (1s, 2s, 4s, ... capped at
+    SUMMARY_RETRY_BACKOFF_CAP), or drop it once its items have used up their retries.
+    """
+    attempt = max(item.get("retries", 0) for item in batched_items)
+    if attempt >= SUMMARY_MAX_TASK_RETRIES:
+        log_error(session_name, "_process_batch", f"dropping {len(batched_items)} events after {attempt} retries: {reason}")
+        print(f"[summary-worker] giving up on {len(batched_items)} events for session {session_name} after {attempt} retries", file=sys.stderr)
         return
+    
+    delay = min(SUMMARY_RETRY_BACKOFF_CAP, 2 ** attempt)
+    print(f"[summary-worker] retrying {len(batched_items)} events for session {session_name} in {delay:.0f}s (retry {attempt + 1}/{SUMMARY_MAX_TASK_RETRIES})", file=sys.stderr)
+    # The session stays in flight while we wait, so its other events can't jump ahead of this batch
+    time.sleep(delay)
+    for item in batched_items:
+        item["retries"] = item.get("retries", 0) + 1
+    requeue_items(batched_items)
 
-    # Main worker loop with batching and dynamic token limit adjustment
-    while True:
-        task = None
-        session_name = None
-        batched_items = []
-        
-        try:
-            # Get the first task
-            task = _summary_queue.get()
-            session_name = task["session_name"]
-            
-            # Now try to batch additional items for the same session using current token limit
-            current_limit = get_current_token_limit()
-            batched_items = [task] + peek_queue_for_same_session(session_name, current_limit)
-            
-            print(f"[summary-worker] processing batch of {len(batched_items)} events for session {session_name} (limit: {current_limit})", file=sys.stderr)
-            
-        except Exception as e:
-            print(f"[summary-worker] failed to get task from queue: {e}", file=sys.stderr)
-            time.sleep(0.1)
-            continue
 
-        retry_count = 0
-        max_retries = 3
-        
+def _process_batch(session_name: str, batched_items: List[Dict[str, Any]]) -> None:
+    """
+    Generate and save the summary for one batch. On a context length error the batch is halved
+    and retried in place; the items split off go back to the queue once, when this batch is done.
+    """
+    retry_count = 0
+    max_retries = 3
+    # Items split off the batch by context length errors, in queue order
+    deferred_items: List[Dict[str, Any]] = []
+    
+    try:
         while retry_count < max_retries:
             try:
-                # Use the old_summary from the first item (they should all be similar since they're queued in order)
-                old_summary = batched_items[0]["old_summary"]
+                # Build on the document as it is now: the old_summary captured at enqueue time predates any
+                # batches saved since, and summarizing against it would drop the facts they added
+                old_summary = load_session_summary(session_name)
                 
                 # Generate the summary using the new generator
                 result = _summary_generator.generate_summary(old_summary, batched_items)
@@ -407,44 +378,162 @@ def _summary_worker() -> None:
                     error_msg = result["error"]
                     
                     # Check if this is a context length error
-                    if "context length" in error_msg.lower():
+                    context_match = _CONTEXT_LENGTH_ERROR_RE.search(error_msg)
+                    if context_match:
                         print(f"[summary-worker] context length error detected: {error_msg}", file=sys.stderr)
                         
-                        # Try to handle the context length error
-                        if handle_context_length_error(error_msg, session_name):
-                            # If we successfully adjusted the token limit, we need to re-batch
-                            print(f"[summary-worker] re-batching with adjusted token limit", file=sys.stderr)
-                            
-                            # Re-queue the items that were in this batch (except the first one which we'll retry)
+                        # Try to handle the context length error, reusing the length the match already found
+                        reported_length = context_match.group(1)
+                        context_length = int(reported_length) if reported_length else None
+                        if handle_context_length_error(error_msg, session_name, context_length):
+                            # Halve the batch and retry it in place; the split-off items are re-queued
+                            # once at the end instead of going back through the queue on every retry
                             if len(batched_items) > 1:
-                                requeue_items(batched_items[1:])
-                                # Update batched_items to just the first item
-                                batched_items = [batched_items[0]]
+                                keep = len(batched_items) // 2
+                                deferred_items[:0] = batched_items[keep:]
+                                batched_items = batched_items[:keep]
+                            print(f"[summary-worker] retrying with {len(batched_items)} events after adjusting token limit", file=sys.stderr)
                             
                             # Retry with the adjusted limit
                             retry_count += 1
                             continue
                         else:
                             # If we couldn't handle the error, log it and break
-                            log_error(session_name, "_summary_worker", f"failed to handle context length error: {error_msg}")
+                            log_error(session_name, "_process_batch", f"failed to handle context length error: {error_msg}")
                             break
                     else:
-                        # Not a context length error, log and break
-                        log_error(session_name, "_summary_worker", f"summary generation failed: {error_msg}")
+                        # Not a context length error: log it and retry the batch later rather than losing its events
+                        log_error(session_name, "_process_batch", f"summary generation failed: {error_msg}")
                         print(f"[summary-worker] summary generation failed for session {session_name}: {error_msg}", file=sys.stderr)
+                        # Deferred items go back first so the retried batch lands in front of them
+                        requeue_items(deferred_items)
+                        deferred_items = []
+                        _retry_after_backoff(session_name, batched_items, error_msg)
                         break
 
             except Exception as e:
-                log_error(session_name or "unknown", "_summary_worker", f"unexpected error in summary worker batch: {e}")
+                log_error(session_name, "_process_batch", f"unexpected error in summary worker batch: {e}")
                 print(f"[summary-worker] unexpected error: {e}", file=sys.stderr)
+                requeue_items(deferred_items)
+                deferred_items = []
+                _retry_after_backoff(session_name, batched_items, str(e))
                 break  # Break out of retry loop
+        else:
+            # Still too long after every halving: re-batch later under the lowered limit rather than dropping it
+            requeue_items(deferred_items)
+            deferred_items = []
+            _retry_after_backoff(session_name, batched_items, "context length exceeded after re-batching")
+    finally:
+        requeue_items(deferred_items)
+
+
+def _process_session(session_name: str) -> None:
+    """
+    Summarize a session's batches on a pool thread, then release the session.
+    
+    Events that arrive while a batch is with the LLM accumulate in the session's queue and are
+    taken as the next batch as soon as the call completes, rather than waiting to be re-dispatched.
+    The thread only gives up its slot early when other sessions are waiting for one.
+    """
+    try:
+        while True:
+            # Batch that session's oldest items using the current token limit
+            current_limit = get_current_token_limit()
+            batched_items = peek_queue_for_same_session(session_name, current_limit)
+            if not batched_items:
+                break
+            
+            print(f"[summary-worker] processing batch of {len(batched_items)} events for session {session_name} (limit: {current_limit})", file=sys.stderr)
+            _process_batch(session_name, batched_items)
+            
+            if _summary_queue.has_waiting_sessions():
+                break
+    except Exception as e:
+        log_error(session_name, "_process_session", f"unexpected error processing session batch: {e}")
+        print(f"[summary-worker] unexpected error: {e}", file=sys.stderr)
+    finally:
+        _summary_queue.release_session(session_name)
+        _summary_slots.release()
+
+
+def _summary_worker() -> None:
+    """Background worker that consumes the queue and updates session summaries; robust to errors."""
+    global _summary_worker_init_success, _summary_worker_init_error, _summary_generator, _summary_system_available
+    
+    print(f"[summary-worker] starting background thread with Python: {sys.executable}", file=sys.stderr)
+    
+    # Initialize the summary generator
+    try:
+        with _generator_lock:
+            _summary_generator = SummaryGenerator(LLM_MODEL_NAME)
+        
+        # Try to initialize the LLM
+        init_success = _summary_generator.initialize()
+        
+        if not init_success and not _summary_generator.llm_available:
+            # dazllm is installed but can't be imported: run without summaries rather than fail startup
+            print(f"[summary-worker] {_summary_generator.init_error}", file=sys.stderr)
+            _summary_worker_init_success = True
+            _summary_worker_init_error = None
+            _summary_worker_init_event.set()
+            return
+
+        if not init_success:
+            error_msg = _summary_generator.init_error or "Unknown initialization error"
+            print(f"[summary-worker] {error_msg}", file=sys.stderr)
+            _summary_worker_init_success = False
+            _summary_worker_init_error = error_msg
+            _summary_worker_init_event.set()
+            return
         
-        # Final cleanup - mark the first task as done 
-        # (others were either marked done during batching or re-queued)
+        # Signal successful initialization
+        print(f"[summary-worker] LLM successfully initialized", file=sys.stderr)
+        _summary_worker_init_success = True
+        _summary_worker_init_error = None
+        _summary_system_available = True
+        _summary_worker_init_event.set()
+        
+    except Exception as e:
+        error_msg = f"Unexpected error during LLM initialization: {e}"
+        print(f"[summary-worker] {error_msg}", file=sys.stderr)
+        _summary_worker_init_success = False
+        _summary_worker_init_error = error_msg
+        _summary_worker_init_event.set()
+        return
+
+    # Dispatch loop: hand each session with pending work to the pool, at most one batch per session at a time
+    executor = ThreadPoolExecutor(max_workers=SUMMARY_MAX_CONCURRENCY, thread_name_prefix="summary-batch")
+    consecutive_failures = 0
+    while True:
+        _summary_slots.acquire()
         try:
-            _summary_queue.task_done()
+            # Wait for the next session with pending work that isn't already being summarized
+            session_name = _summary_queue.next_session()
         except Exception as e:
-            print(f"[summary-worker] failed to mark task done: {e}", file=sys.stderr)
+            _summary_slots.release()
+            consecutive_failures += 1
+            # next_session() blocks on the queue itself and only raises on a bug: retry a one-off failure
+            # almost at once, but back off (10ms doubling up to the cap) so a persistent one can't spin
+            delay = min(_DISPATCH_RETRY_BACKOFF_CAP, _DISPATCH_RETRY_BASE_DELAY * 2 ** min(consecutive_failures - 1, 16))
+            print(f"[summary-worker] failed to get task from queue (failure {consecutive_failures}, retrying in {delay:.2f}s): {e}", file=sys.stderr)
+            traceback.print_exc(file=sys.stderr)
+            time.sleep(delay)
+            continue
+        consecutive_failures = 0
+        
+        if session_name is None:
+            # Queue closed for shutdown: let in-flight batches finish, but don't start new ones
+            _summary_slots.release()
+            executor.shutdown(wait=False)
+            print("[summary-worker] queue closed, dispatch loop stopped", file=sys.stderr)
+            return
+        
+        executor.submit(_process_session, session_name)
+
+
+def shutdown_summary_worker() -> None:
+    """Stop the summary worker from taking new batches, so shutdown only waits for batches already running."""
+    _summary_queue.close()
 
 
 def ensure_summary_thread() -> None:
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Tests for the file tools in command_executor: copying and writing.
+"""
+
+import errno
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import src.utils as utils
+from src import command_executor
+from src.session_manager import wait_for_event_pipeline
+from src.utils import flush_logs, set_active_session_name
+
+
+class FileToolTestCase(unittest.TestCase):
+    """Runs each test in its own sessions directory with an active session and a scratch directory"""
+
+    def setUp(self):
+        self.test_sessions_dir = Path(tempfile.mkdtemp(prefix="daz_test_sessions_"))
+        self.work_dir = Path(tempfile.mkdtemp(prefix="daz_test_files_"))
+        self.original_sessions_dir = utils.SESSIONS_DIR
+        utils.SESSIONS_DIR = self.test_sessions_dir
+        utils.get_session_dir.cache_clear()
+        (self.test_sessions_dir / "file_tools_test").mkdir()
+        set_active_session_name("file_tools_test")
+
+    def tearDown(self):
+        wait_for_event_pipeline()
+        flush_logs()
+        utils.close_all_logs()
+        set_active_session_name(None)
+        utils.SESSIONS_DIR = self.original_sessions_dir
+        utils.get_session_dir.cache_clear()
+        shutil.rmtree(self.test_sessions_dir, ignore_errors=True)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def copy(self, source, destination, **kwargs):
+        return command_executor.copy_file(str(source), str(destination), "testing", "set up files", "copy a file", **kwargs)
+
+    def write(self, path, content):
+        return command_executor.write_file(str(path), content, "testing", "set up files", "write a file")
+
+
+class TestCopyFile(FileToolTestCase):
+    """copy_file / _copy_file_data"""
+
+    def test_copies_content_and_creates_directories(self):
+        source = self.work_dir / "source.bin"
+        data = os.urandom(3 * 1024 * 1024 + 17)
+        source.write_bytes(data)
+        destination = self.work_dir / "nested" / "dir" / "copy.bin"
+
+        result = self.copy(source, destination)
+
+        self.assertTrue(result["success"])
+        self.assertEqual(destination.read_bytes(), data)
+
+    def test_copies_empty_file(self):
+        source = self.work_dir / "empty.txt"
+        source.write_bytes(b"")
+        destination = self.work_dir / "copy.txt"
+        destination.write_bytes(b"old content")
+
+        self.copy(source, destination)
+
+        self.assertEqual(destination.read_bytes(), b"")
+
+    def test_copy_onto_itself_is_refused_and_keeps_the_file(self):
+        source = self.work_dir / "f.txt"
+        source.write_text("keep me")
+
+        with self.assertRaises(ValueError):
+            self.copy(source, source)
+
+        self.assertEqual(source.read_text(), "keep me")
+
+    def test_copy_onto_a_link_to_the_source_is_refused(self):
+        source = self.work_dir / "f.txt"
+        source.write_text("keep me")
+        symlink = self.work_dir / "link.txt"
+        symlink.symlink_to(source)
+        hardlink = self.work_dir / "hard.txt"
+        os.link(source, hardlink)
+
+        for destination in (symlink, hardlink):
+            with self.assertRaises(shutil.SameFileError):
+                command_executor._copy_file_data(source, destination)
+
+        self.assertEqual(source.read_text(), "keep me")
+
+    def test_falls_back_to_read_write_when_copy_file_range_is_unsupported(self):
+        source = self.work_dir / "source.bin"
+        data = os.urandom(2 * 1024 * 1024 + 3)
+        source.write_bytes(data)
+        destination = self.work_dir / "copy.bin"
+
+        unsupported = OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+        with mock.patch.object(os, "copy_file_range", side_effect=unsupported, create=True):
+            copied = command_executor._copy_file_data(source, destination)
+
+        self.assertEqual(copied, len(data))
+        self.assertEqual(destination.read_bytes(), data)
+
+    def test_copies_files_the_kernel_reports_as_empty(self):
+        # procfs files report size 0 and copy_file_range copies nothing from them
+        source = Path("/proc/self/status")
+        if not source.exists():
+            self.skipTest("needs /proc")
+        destination = self.work_dir / "status.txt"
+
+        copied = command_executor._copy_file_data(source, destination)
+
+        self.assertGreater(copied, 0)
+        self.assertTrue(destination.read_text().startswith("Name:"))
+
+    def test_missing_source_raises(self):
+        with self.assertRaises(ValueError):
+            self.copy(self.work_dir / "missing.txt", self.work_dir / "copy.txt")
+        self.assertFalse((self.work_dir / "copy.txt").exists())
+
+
+class TestWriteFile(FileToolTestCase):
+    """write_file / _write_text_file"""
+
+    def logged_events(self):
+        flush_logs()
+        log_path = self.test_sessions_dir / "file_tools_test" / "event_log.jsonl"
+        return [json.loads(line) for line in log_path.read_text().splitlines()]
+
+    def test_large_content_is_on_disk_when_the_tool_returns(self):
+        path = self.work_dir / "big" / "file.txt"
+        content = "é0123456789\n" * 300_000  # ~3.6MB encoded, several write slices
+
+        result = self.write(path, content)
+
+        self.assertTrue(result["success"])
+        self.assertEqual(path.read_text(encoding="utf-8"), content)
+
+    def test_overwrite_truncates_previous_content(self):
+        path = self.work_dir / "file.txt"
+        self.write(path, "x" * (2 * 1024 * 1024))
+        self.write(path, "short")
+        self.assertEqual(path.read_text(), "short")
+
+    @unittest.skipUnless(os.path.exists("/dev/full"), "needs /dev/full")
+    def test_write_failure_is_reported_and_logged_as_failed(self):
+        content = "x" * (2 * 1024 * 1024)
+
+        with self.assertRaises(ValueError):
+            self.write("/dev/full", content)
+
+        event = self.logged_events()[-1]
+        self.assertEqual(event["type"], "write")
+        self.assertFalse(event["outputs"]["success"])
+        self.assertIn("No space left", event["outputs"]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
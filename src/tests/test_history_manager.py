@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tests for history.json handling in history_manager
+"""
+
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import src.utils as utils
+from src.history_manager import MAX_HISTORY_SIZE, load_session_history, trim_history_to_size
+from src.session_manager import record_user_request_in_order, wait_for_event_pipeline
+
+
+class HistoryTestCase(unittest.TestCase):
+    """Runs each test against its own sessions directory"""
+
+    session_name = "history_test"
+
+    def setUp(self):
+        self.test_sessions_dir = Path(tempfile.mkdtemp(prefix="daz_test_sessions_"))
+        self.original_sessions_dir = utils.SESSIONS_DIR
+        utils.SESSIONS_DIR = self.test_sessions_dir
+        utils.get_session_dir.cache_clear()
+        (self.test_sessions_dir / self.session_name).mkdir()
+
+    def tearDown(self):
+        wait_for_event_pipeline()
+        utils.SESSIONS_DIR = self.original_sessions_dir
+        utils.get_session_dir.cache_clear()
+        shutil.rmtree(self.test_sessions_dir, ignore_errors=True)
+
+
+def history_of(count, size):
+    return [{"n": n, "text": "é" * size} for n in range(count)]
+
+
+class TestTrimHistoryToSize(unittest.TestCase):
+    """trim_history_to_size() keeps the newest entries that fit in MAX_HISTORY_SIZE characters"""
+
+    def test_history_under_the_limit_is_returned_unchanged(self):
+        history = history_of(10, 100)
+        self.assertIs(trim_history_to_size(history), history)
+        self.assertEqual(trim_history_to_size([]), [])
+
+    def test_oldest_entries_are_dropped_until_it_fits(self):
+        history = history_of(100, 1000)
+
+        trimmed = trim_history_to_size(history)
+
+        self.assertLessEqual(len(json.dumps(trimmed, ensure_ascii=False)), MAX_HISTORY_SIZE)
+        self.assertEqual(trimmed, history[-len(trimmed):])
+        # Dropping one entry fewer would not have fit
+        longer = history[-len(trimmed) - 1:]
+        self.assertGreater(len(json.dumps(longer, ensure_ascii=False)), MAX_HISTORY_SIZE)
+
+    def test_size_estimate_matches_the_serialized_list_exactly(self):
+        # Entry sizes chosen so the whole list serializes to exactly the limit
+        entry_size = len(json.dumps({"n": 0, "text": ""}, ensure_ascii=False))
+        text_size = (MAX_HISTORY_SIZE - 2 - 2 * 3) // 4 - entry_size
+        history = [{"n": n, "text": "x" * text_size} for n in range(4)]
+        padding = MAX_HISTORY_SIZE - len(json.dumps(history, ensure_ascii=False))
+        history[0]["text"] += "x" * padding
+        self.assertEqual(len(json.dumps(history, ensure_ascii=False)), MAX_HISTORY_SIZE)
+        self.assertIs(trim_history_to_size(history), history)
+
+        history[0]["text"] += "x"
+        self.assertEqual(trim_history_to_size(history), history[1:])
+
+    def test_a_single_oversized_entry_is_kept(self):
+        history = history_of(3, MAX_HISTORY_SIZE)
+        self.assertEqual(trim_history_to_size(history), history[-1:])
+
+
+class TestRecordUserRequest(HistoryTestCase):
+    """record_user_request_in_order"""
+
+    def test_concurrent_requests_are_all_kept_and_never_read_half_written(self):
+        writers, per_writer = 4, 10
+        seen_empty_after_first_save = []
+        stop = threading.Event()
+
+        def reader():
+            saved = False
+            while not stop.is_set():
+                history = load_session_history(self.session_name)
+                if history:
+                    saved = True
+                elif saved:
+                    seen_empty_after_first_save.append(True)
+
+        def writer(index):
+            for i in range(per_writer):
+                record_user_request_in_order(self.session_name, f"request {index}-{i}")
+
+        reader_thread = threading.Thread(target=reader)
+        reader_thread.start()
+        threads = [threading.Thread(target=writer, args=(index,)) for index in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stop.set()
+        reader_thread.join()
+
+        history = load_session_history(self.session_name)
+        self.assertEqual(len(history), writers * per_writer)
+        self.assertEqual({entry["event_type"] for entry in history}, {"user_request"})
+        self.assertFalse(seen_empty_after_first_save)
+        self.assertFalse((self.test_sessions_dir / self.session_name / "history.json.tmp").exists())
+
+    def test_requests_keep_their_order(self):
+        for i in range(5):
+            record_user_request_in_order(self.session_name, f"request {i}")
+
+        history = load_session_history(self.session_name)
+        self.assertEqual([entry["user_request"] for entry in history], [f"request {i}" for i in range(5)])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
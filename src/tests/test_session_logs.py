@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Tests for the session log journal in utils: ordering, flushing, event counts and blob sidecars
+"""
+
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import src.utils as utils
+from src.utils import (
+    append_error_to_log, append_event_to_log, append_llm_interaction_to_log, close_all_logs,
+    close_session_logs, flush_logs, get_events_count, get_session_dir, release_session_files
+)
+
+
+def event(n, **outputs):
+    return {"timestamp": float(n), "type": "run", "inputs": {"n": n}, "outputs": outputs}
+
+
+class SessionLogTestCase(unittest.TestCase):
+    """Runs each test against its own sessions directory"""
+
+    def setUp(self):
+        self.test_sessions_dir = Path(tempfile.mkdtemp(prefix="daz_test_sessions_"))
+        self.original_sessions_dir = utils.SESSIONS_DIR
+        utils.SESSIONS_DIR = self.test_sessions_dir
+        utils.get_session_dir.cache_clear()
+
+    def tearDown(self):
+        close_all_logs()
+        with utils._events_count_lock:
+            utils._events_count.clear()
+        utils.SESSIONS_DIR = self.original_sessions_dir
+        utils.get_session_dir.cache_clear()
+        shutil.rmtree(self.test_sessions_dir, ignore_errors=True)
+
+    def read_log(self, session_name, name="event_log.jsonl"):
+        path = get_session_dir(session_name) / name
+        return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+class TestJournalOrdering(SessionLogTestCase):
+    """Lines reach each log file in the order they were appended"""
+
+    def test_flush_writes_every_queued_line_in_order(self):
+        for n in range(200):
+            append_event_to_log("a" if n % 3 else "b", event(n))
+
+        flush_logs()
+
+        self.assertEqual([e["inputs"]["n"] for e in self.read_log("a")], [n for n in range(200) if n % 3])
+        self.assertEqual([e["inputs"]["n"] for e in self.read_log("b")], [n for n in range(200) if not n % 3])
+
+    def test_concurrent_appends_keep_each_threads_order(self):
+        threads, per_thread = 8, 100
+
+        def append_all(index):
+            for i in range(per_thread):
+                append_event_to_log("shared", event(index * per_thread + i))
+
+        workers = [threading.Thread(target=append_all, args=(index,)) for index in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        flush_logs()
+
+        logged = [e["inputs"]["n"] for e in self.read_log("shared")]
+        self.assertEqual(sorted(logged), list(range(threads * per_thread)))
+        for index in range(threads):
+            mine = [n for n in logged if n // per_thread == index]
+            self.assertEqual(mine, sorted(mine))
+
+    def test_close_session_logs_flushes_queued_lines(self):
+        for n in range(3):
+            append_event_to_log("a", event(n))
+
+        close_session_logs("a")
+
+        self.assertEqual([e["inputs"]["n"] for e in self.read_log("a")], [0, 1, 2])
+        self.assertFalse([path for path in utils._log_fds if path.parent == get_session_dir("a")])
+
+    def test_released_session_can_be_moved_and_recreated(self):
+        for n in range(3):
+            append_event_to_log("old", event(n))
+
+        # As rename_session does before moving the directory
+        release_session_files("old")
+        get_session_dir("old").rename(self.test_sessions_dir / "new")
+        append_event_to_log("old", event(3))
+        flush_logs()
+
+        self.assertEqual([e["inputs"]["n"] for e in self.read_log("new")], [0, 1, 2])
+        self.assertEqual([e["inputs"]["n"] for e in self.read_log("old")], [3])
+
+    def test_descriptor_cache_stays_bounded(self):
+        sessions = utils._MAX_OPEN_LOG_FDS + 10
+        for round_number in range(2):
+            for index in range(sessions):
+                append_event_to_log(f"s{index}", event(round_number))
+            flush_logs()
+
+        self.assertLessEqual(len(utils._log_fds), utils._MAX_OPEN_LOG_FDS)
+        for index in range(sessions):
+            self.assertEqual([e["inputs"]["n"] for e in self.read_log(f"s{index}")], [0, 1])
+
+    def test_llm_and_error_logs_get_their_own_files(self):
+        append_llm_interaction_to_log("a", {"prompt": "p", "response": "r"})
+        append_error_to_log("a", {"error": "boom"})
+        flush_logs()
+
+        self.assertEqual(self.read_log("a", "llm_summary.jsonl"), [{"prompt": "p", "response": "r"}])
+        self.assertEqual(self.read_log("a", "errors.jsonl"), [{"error": "boom"}])
+
+
+class TestEventsCount(SessionLogTestCase):
+    """get_events_count()"""
+
+    def test_missing_log_counts_zero(self):
+        self.assertEqual(get_events_count("nothing"), 0)
+
+    def test_counts_queued_and_later_appends(self):
+        for n in range(5):
+            append_event_to_log("a", event(n))
+        self.assertEqual(get_events_count("a"), 5)
+
+        append_event_to_log("a", event(5))
+        self.assertEqual(get_events_count("a"), 6)
+
+    def test_counts_an_existing_log_including_an_unterminated_last_line(self):
+        session_dir = get_session_dir("a")
+        session_dir.mkdir()
+        (session_dir / "event_log.jsonl").write_text('{"n": 0}\n{"n": 1}\n{"n": 2}', encoding="utf-8")
+
+        self.assertEqual(get_events_count("a"), 3)
+
+    def test_count_is_recounted_after_the_session_files_are_released(self):
+        append_event_to_log("a", event(0))
+        self.assertEqual(get_events_count("a"), 1)
+
+        release_session_files("a")
+        with (get_session_dir("a") / "event_log.jsonl").open("a", encoding="utf-8") as f:
+            f.write('{"n": 1}\n')
+
+        self.assertEqual(get_events_count("a"), 2)
+
+
+class TestBlobSidecars(SessionLogTestCase):
+    """Large outputs go to blobs/ instead of the event log line"""
+
+    def test_large_outputs_are_moved_to_sidecar_files(self):
+        stdout = "x" * (utils._LOG_BLOB_THRESHOLD + 1)
+        original = event(0, stdout=stdout, stderr="small", returncode=0)
+
+        append_event_to_log("a", original)
+        flush_logs()
+
+        logged = self.read_log("a")[0]["outputs"]
+        self.assertEqual(logged["stderr"], "small")
+        self.assertEqual(logged["returncode"], 0)
+        self.assertEqual(logged["stdout"]["length"], len(stdout))
+        blob_path = get_session_dir("a") / logged["stdout"]["blob"]
+        self.assertEqual(blob_path.parent.name, "blobs")
+        self.assertEqual(blob_path.read_text(encoding="utf-8"), stdout)
+        # The caller's event is left as it was
+        self.assertEqual(original["outputs"]["stdout"], stdout)
+
+    def test_outputs_at_the_threshold_stay_inline(self):
+        content = "y" * utils._LOG_BLOB_THRESHOLD
+
+        append_event_to_log("a", event(0, content=content))
+        flush_logs()
+
+        self.assertEqual(self.read_log("a")[0]["outputs"]["content"], content)
+        self.assertFalse((get_session_dir("a") / "blobs").exists())
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Tests for the SummaryQueue in models
+"""
+
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.models import SummaryQueue
+
+
+def task(session_name, n, tokens=1):
+    return {"session_name": session_name, "n": n, "tokens": tokens}
+
+
+def numbers(items):
+    return [item["n"] for item in items]
+
+
+def estimate(item):
+    return item["tokens"]
+
+
+class TestPopBatch(unittest.TestCase):
+    """pop_batch() token budgeting"""
+
+    def setUp(self):
+        self.queue = SummaryQueue()
+
+    def test_takes_oldest_tasks_while_they_fit_and_leaves_the_rest_in_order(self):
+        for n in range(5):
+            self.queue.put(task("a", n, tokens=10))
+
+        self.assertEqual(numbers(self.queue.pop_batch("a", 30, estimate)), [0, 1, 2])
+        self.assertEqual(self.queue.qsize(), 2)
+        self.assertEqual(numbers(self.queue.pop_batch("a", 30, estimate)), [3, 4])
+        self.assertTrue(self.queue.empty())
+
+    def test_always_takes_the_first_task_even_if_it_is_over_budget(self):
+        self.queue.put(task("a", 0, tokens=500))
+        self.queue.put(task("a", 1, tokens=1))
+
+        self.assertEqual(numbers(self.queue.pop_batch("a", 100, estimate)), [0])
+        self.assertEqual(numbers(self.queue.pop_batch("a", 100, estimate)), [1])
+
+    def test_a_lone_task_is_not_estimated(self):
+        self.queue.put(task("a", 0))
+
+        def fail(item):
+            raise AssertionError("estimate called for a lone task")
+
+        self.assertEqual(numbers(self.queue.pop_batch("a", 1, fail)), [0])
+
+    def test_only_takes_the_requested_session(self):
+        self.queue.put(task("a", 0))
+        self.queue.put(task("b", 1))
+        self.queue.put(task("a", 2))
+
+        self.assertEqual(numbers(self.queue.pop_batch("a", 100, estimate)), [0, 2])
+        self.assertEqual(numbers(self.queue.pop_batch("b", 100, estimate)), [1])
+        self.assertEqual(self.queue.pop_batch("c", 100, estimate), [])
+
+
+class TestPushFront(unittest.TestCase):
+    """push_front() returns tasks ahead of the session's pending ones"""
+
+    def test_returned_tasks_keep_their_order_ahead_of_newer_ones(self):
+        queue = SummaryQueue()
+        for n in range(4):
+            queue.put(task("a", n))
+        taken = queue.pop_batch("a", 2, estimate)
+        self.assertEqual(numbers(taken), [0, 1])
+        queue.put(task("a", 4))
+
+        queue.push_front("a", taken)
+
+        self.assertEqual(queue.qsize(), 5)
+        self.assertEqual(numbers(queue.pop_batch("a", 100, estimate)), [0, 1, 2, 3, 4])
+
+    def test_push_front_of_nothing_is_a_no_op(self):
+        queue = SummaryQueue()
+        queue.push_front("a", [])
+        self.assertTrue(queue.empty())
+
+
+class TestDropOldest(unittest.TestCase):
+    """A bounded queue evicts its oldest pending task for each new one"""
+
+    def test_full_queue_drops_the_oldest_task(self):
+        queue = SummaryQueue(maxsize=3)
+        dropped = [queue.put(task("a", n)) for n in range(5)]
+
+        self.assertEqual(dropped, [False, False, False, True, True])
+        self.assertEqual(queue.dropped_count(), 2)
+        self.assertEqual(queue.qsize(), 3)
+        self.assertEqual(numbers(queue.pop_batch("a", 100, estimate)), [2, 3, 4])
+
+    def test_eviction_removes_an_emptied_session(self):
+        queue = SummaryQueue(maxsize=1)
+        queue.put(task("a", 0))
+        queue.put(task("b", 1))
+
+        self.assertEqual(queue.pop_batch("a", 100, estimate), [])
+        self.assertEqual(numbers(queue.pop_batch("b", 100, estimate)), [1])
+        self.assertTrue(queue.empty())
+
+
+class TestNextSession(unittest.TestCase):
+    """next_session() dispatch"""
+
+    def test_round_robin_skips_sessions_in_flight(self):
+        queue = SummaryQueue()
+        queue.put(task("a", 0))
+        queue.put(task("b", 1))
+
+        self.assertEqual(queue.next_session(), "a")
+        self.assertEqual(queue.next_session(), "b")
+        self.assertFalse(queue.has_waiting_sessions())
+
+        queue.pop_batch("b", 100, estimate)
+        queue.release_session("b")
+        queue.release_session("a")
+        self.assertTrue(queue.has_waiting_sessions())
+        self.assertEqual(queue.next_session(), "a")
+
+
+class TestWaitEmptyAndClose(unittest.TestCase):
+    """wait_empty() and close()"""
+
+    def test_wait_empty_returns_at_once_for_an_empty_queue(self):
+        self.assertTrue(SummaryQueue().wait_empty(timeout=5))
+
+    def test_wait_empty_times_out_while_tasks_are_pending(self):
+        queue = SummaryQueue()
+        queue.put(task("a", 1))
+        self.assertFalse(queue.wait_empty(timeout=0.05))
+
+    def test_wait_empty_wakes_when_the_last_task_is_taken(self):
+        queue = SummaryQueue()
+        queue.put(task("a", 1))
+        queue.put(task("a", 2))
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(queue.wait_empty(timeout=5)))
+        waiter.start()
+
+        time.sleep(0.05)
+        self.assertEqual(queue.next_session(), "a")
+        self.assertEqual(numbers(queue.pop_batch("a", 10, estimate)), [1, 2])
+        waiter.join(timeout=5)
+
+        self.assertEqual(results, [True])
+
+    def test_close_wakes_wait_empty_without_waiting_for_the_timeout(self):
+        queue = SummaryQueue()
+        queue.put(task("a", 1))
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(queue.wait_empty(timeout=30)))
+        start = time.monotonic()
+        waiter.start()
+
+        time.sleep(0.05)
+        queue.close()
+        waiter.join(timeout=5)
+
+        self.assertEqual(results, [False])
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_wait_empty_on_a_closed_queue_does_not_block(self):
+        queue = SummaryQueue()
+        queue.put(task("a", 1))
+        queue.close()
+        start = time.monotonic()
+        self.assertFalse(queue.wait_empty(timeout=30))
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_close_releases_a_blocked_next_session(self):
+        queue = SummaryQueue()
+        results = []
+        consumer = threading.Thread(target=lambda: results.append(queue.next_session()))
+        consumer.start()
+
+        time.sleep(0.05)
+        queue.close()
+        consumer.join(timeout=5)
+
+        self.assertEqual(results, [None])
+        self.assertEqual(queue.pop_batch("a", 10, estimate), [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
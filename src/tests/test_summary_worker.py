@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Tests for the summary worker's dispatch loop and batch processing, with a stand-in generator
+"""
+
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+import src.summary_worker as summary_worker
+from src.models import SummaryQueue
+from src.summary_generator import SummaryGenerator
+
+
+class StubGenerator:
+    """Stands in for SummaryGenerator without an LLM"""
+
+    init_error = None
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def initialize(self):
+        return True
+
+    def estimate_tokens(self, text, model_name=None):
+        return len(text) // 4
+
+    def extract_context_length_from_error(self, error_message):
+        return None
+
+
+class ScriptedGenerator(StubGenerator):
+    """Answers each generate_summary() call with the next scripted outcome, recording the batches"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.batches = []
+
+    def generate_summary(self, old_summary, events_data):
+        self.batches.append([item["n"] for item in events_data])
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, Exception):
+            raise outcome
+        if outcome == "ok":
+            return {"success": True, "summary": f"summary of {len(events_data)}", "error": None}
+        return {"success": False, "summary": "", "error": outcome}
+
+
+def batch_items(count, retries=0):
+    return [{"session_name": "a", "n": n, "old_summary": "", "event": {}, "retries": retries} for n in range(count)]
+
+
+CONTEXT_ERROR = "Reached context length of 4096 tokens with model"
+
+
+class TestDispatchLoop(unittest.TestCase):
+    """_summary_worker's handling of a failing queue"""
+
+    def setUp(self):
+        self.saved_state = (summary_worker._summary_generator, summary_worker._summary_system_available)
+
+    def tearDown(self):
+        summary_worker._summary_generator, summary_worker._summary_system_available = self.saved_state
+
+    def run_dispatch_loop(self, failures):
+        """Run the loop against a queue whose next_session() raises `failures` times, then closes; return the sleeps"""
+        calls = []
+
+        def next_session():
+            calls.append(None)
+            if len(calls) <= failures:
+                raise RuntimeError("queue bug")
+            return None
+
+        with mock.patch.object(summary_worker, "SummaryGenerator", StubGenerator), \
+                mock.patch.object(summary_worker._summary_queue, "next_session", next_session), \
+                mock.patch.object(summary_worker.time, "sleep") as sleep, \
+                mock.patch("sys.stderr"):
+            summary_worker._summary_worker()
+        self.assertEqual(len(calls), failures + 1)
+        return [call.args[0] for call in sleep.call_args_list]
+
+    def test_repeated_failures_back_off_exponentially_up_to_the_cap(self):
+        delays = self.run_dispatch_loop(failures=15)
+
+        self.assertEqual(delays[0], summary_worker._DISPATCH_RETRY_BASE_DELAY)
+        self.assertEqual(delays[1], 2 * summary_worker._DISPATCH_RETRY_BASE_DELAY)
+        self.assertEqual(delays, sorted(delays))
+        self.assertEqual(delays[-1], summary_worker._DISPATCH_RETRY_BACKOFF_CAP)
+        self.assertTrue(all(delay > 0 for delay in delays))
+
+    def test_slots_are_returned_after_failures(self):
+        self.run_dispatch_loop(failures=3)
+
+        # Every slot can still be taken: none leaked on the failure path
+        acquired = 0
+        while summary_worker._summary_slots.acquire(blocking=False):
+            acquired += 1
+        for _ in range(acquired):
+            summary_worker._summary_slots.release()
+        self.assertEqual(acquired, summary_worker.SUMMARY_MAX_CONCURRENCY)
+
+
+class TestBrokenDazllmInstall(unittest.TestCase):
+    """A dazllm that is installed but fails to import disables summaries instead of failing startup"""
+
+    def setUp(self):
+        self.saved_state = (
+            summary_worker._summary_generator, summary_worker._summary_system_available,
+            summary_worker._summary_worker_init_success, summary_worker._summary_worker_init_error,
+        )
+        summary_worker._summary_worker_init_event.clear()
+
+    def tearDown(self):
+        (summary_worker._summary_generator, summary_worker._summary_system_available,
+         summary_worker._summary_worker_init_success, summary_worker._summary_worker_init_error) = self.saved_state
+        summary_worker._summary_worker_init_event.clear()
+
+    def test_import_error_reports_the_llm_as_unavailable(self):
+        generator = SummaryGenerator()
+        generator._llm_available = True
+        with mock.patch.dict(sys.modules, {"dazllm": None}):
+            self.assertFalse(generator.initialize())
+        self.assertFalse(generator.llm_available)
+        self.assertIn("could not be imported", generator.init_error)
+
+    def test_worker_init_completes_without_summaries(self):
+        def broken_generator(*args, **kwargs):
+            generator = SummaryGenerator(*args, **kwargs)
+            generator._llm_available = True
+            return generator
+
+        with mock.patch.object(summary_worker, "SummaryGenerator", broken_generator), \
+                mock.patch.object(summary_worker, "_summary_worker_should_start", True), \
+                mock.patch.dict(sys.modules, {"dazllm": None}), \
+                mock.patch("sys.stderr"):
+            summary_worker._summary_worker()
+            self.assertTrue(summary_worker.wait_for_summary_worker_init(timeout=1))
+
+        self.assertFalse(summary_worker.is_summary_system_available())
+
+
+class TestProcessBatch(unittest.TestCase):
+    """_process_batch(): context length halving and retry with backoff"""
+
+    def setUp(self):
+        self.queue = SummaryQueue()
+        self.saved = [summary_worker._summary_generator, summary_worker._current_token_limit]
+        self.saved_summaries = []
+        summary_worker._current_token_limit = 30000
+        patches = [
+            mock.patch.object(summary_worker, "_summary_queue", self.queue),
+            mock.patch.object(summary_worker, "load_session_summary", return_value="old"),
+            mock.patch.object(summary_worker, "save_session_summary",
+                              side_effect=lambda name, summary: self.saved_summaries.append(summary)),
+            mock.patch.object(summary_worker, "log_llm_interaction"),
+            mock.patch.object(summary_worker, "log_error"),
+            mock.patch("sys.stderr"),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        sleep_patcher = mock.patch.object(summary_worker.time, "sleep")
+        self.sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+
+    def tearDown(self):
+        summary_worker._summary_generator, summary_worker._current_token_limit = self.saved
+
+    def run_batch(self, outcomes, items):
+        generator = ScriptedGenerator(outcomes)
+        summary_worker._summary_generator = generator
+        summary_worker._process_batch("a", items)
+        return generator
+
+    def queued(self):
+        return [item["n"] for item in self.queue.pop_batch("a", 10**9, lambda item: 1)]
+
+    def test_success_saves_once_and_requeues_nothing(self):
+        generator = self.run_batch(["ok"], batch_items(4))
+
+        self.assertEqual(generator.batches, [[0, 1, 2, 3]])
+        self.assertEqual(self.saved_summaries, ["summary of 4"])
+        self.assertTrue(self.queue.empty())
+
+    def test_context_length_error_halves_the_batch_and_requeues_the_rest_in_order(self):
+        generator = self.run_batch([CONTEXT_ERROR, CONTEXT_ERROR, "ok"], batch_items(10))
+
+        self.assertEqual(generator.batches, [list(range(10)), [0, 1, 2, 3, 4], [0, 1]])
+        self.assertEqual(self.saved_summaries, ["summary of 2"])
+        self.assertEqual(self.queued(), [2, 3, 4, 5, 6, 7, 8, 9])
+        # The first error lowered the limit to 90% of the reported length, the second to 90% of that
+        self.assertEqual(summary_worker.get_current_token_limit(), int(int(4096 * 0.9) * 0.9))
+        self.sleep.assert_not_called()
+
+    def test_batch_still_too_long_after_every_halving_is_retried_later(self):
+        generator = self.run_batch([CONTEXT_ERROR] * 3, batch_items(10))
+
+        self.assertEqual(generator.batches, [list(range(10)), [0, 1, 2, 3, 4], [0, 1]])
+        self.assertFalse(self.saved_summaries)
+        # Nothing is lost: the remaining batch goes back ahead of the items split off earlier
+        queued = self.queue.pop_batch("a", 10**9, lambda item: 1)
+        self.assertEqual([item["n"] for item in queued], list(range(10)))
+        self.assertEqual(queued[0]["retries"], 1)
+        self.assertEqual(queued[1]["retries"], 0)
+        self.sleep.assert_called_once_with(1)
+
+    def test_other_failures_are_retried_after_a_backoff(self):
+        generator = self.run_batch(["server unavailable"], batch_items(3, retries=2))
+
+        self.assertEqual(generator.batches, [[0, 1, 2]])
+        self.sleep.assert_called_once_with(4)
+        queued = self.queue.pop_batch("a", 10**9, lambda item: 1)
+        self.assertEqual([item["n"] for item in queued], [0, 1, 2])
+        self.assertEqual({item["retries"] for item in queued}, {3})
+
+    def test_failure_after_halving_requeues_the_batch_ahead_of_the_split_off_items(self):
+        self.run_batch([CONTEXT_ERROR, RuntimeError("connection reset")], batch_items(6))
+
+        self.assertEqual(self.queued(), [0, 1, 2, 3, 4, 5])
+
+    def test_batch_is_dropped_once_its_retries_are_used_up(self):
+        self.run_batch(["server unavailable"], batch_items(3, retries=summary_worker.SUMMARY_MAX_TASK_RETRIES))
+
+        self.sleep.assert_not_called()
+        self.assertTrue(self.queue.empty())
+
+    def test_backoff_is_capped(self):
+        with mock.patch.object(summary_worker, "SUMMARY_MAX_TASK_RETRIES", 20):
+            self.run_batch(["server unavailable"], batch_items(1, retries=10))
+
+        self.sleep.assert_called_once_with(summary_worker.SUMMARY_RETRY_BACKOFF_CAP)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
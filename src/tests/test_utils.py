@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for path helpers in utils
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add the project root to the path so we can import our modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.utils import change_working_directory, get_working_directory, resolve_path
+
+
+class TestResolvePath(unittest.TestCase):
+    """resolve_path must reflect the filesystem as it is at each call"""
+
+    def setUp(self):
+        self.work_dir = Path(tempfile.mkdtemp(prefix="daz_test_paths_")).resolve()
+        self.original_cwd = get_working_directory()
+
+    def tearDown(self):
+        change_working_directory(self.original_cwd)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_follows_a_symlink_that_was_pointed_elsewhere(self):
+        old_target = self.work_dir / "old"
+        new_target = self.work_dir / "new"
+        old_target.mkdir()
+        new_target.mkdir()
+        link = self.work_dir / "link"
+        link.symlink_to(old_target)
+        self.assertEqual(resolve_path(str(link / "file.txt")), old_target / "file.txt")
+
+        link.unlink()
+        link.symlink_to(new_target)
+
+        self.assertEqual(resolve_path(str(link / "file.txt")), new_target / "file.txt")
+
+    def test_sees_a_directory_replaced_by_a_symlink(self):
+        directory = self.work_dir / "dir"
+        directory.mkdir()
+        self.assertEqual(resolve_path(str(directory)), directory)
+
+        target = self.work_dir / "target"
+        target.mkdir()
+        directory.rmdir()
+        directory.symlink_to(target)
+
+        self.assertEqual(resolve_path(str(directory)), target)
+
+    def test_relative_paths_follow_the_working_directory(self):
+        first = self.work_dir / "first"
+        second = self.work_dir / "second"
+        first.mkdir()
+        second.mkdir()
+
+        change_working_directory(str(first))
+        self.assertEqual(resolve_path("a.txt"), first / "a.txt")
+        change_working_directory(str(second))
+        self.assertEqual(resolve_path("a.txt"), second / "a.txt")
+
+    def test_absolute_paths_ignore_the_working_directory(self):
+        change_working_directory(str(self.work_dir))
+        self.assertEqual(resolve_path("/"), Path("/"))
+        self.assertEqual(resolve_path(os.path.join(str(self.work_dir), "x", "..", "y")), self.work_dir / "y")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -5,25 +5,73 @@ Utility functions for DAZ Command MCP Server
 
 from __future__ import annotations
 
+import atexit
 import json
+import os
+import re
 import sys
+import threading
 import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set, Tuple
 
-from .models import SESSIONS_DIR, _active_session_name_lock, _active_session_name
+# Optional fast JSON encoder - falls back to the stdlib encoder when missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .models import SESSIONS_DIR, LOG_FSYNC, LOG_GROUP_COMMIT_WINDOW
+
+
+# --- JSON Serialization ---
+# Stdlib fallback encoders, built once: json.dumps() with non-default options constructs a new
+# JSONEncoder on every call. Compact output matches what orjson produces.
+_JSON_ENCODE_INDENTED = json.JSONEncoder(ensure_ascii=False, indent=2).encode
+_JSON_ENCODE_COMPACT = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+def dumps_json(obj: Any, indent: bool = True) -> str:
+    """Serialize to JSON text (2-space indented by default), using orjson when it is installed."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(obj, option=option).decode("utf-8")
+        except TypeError:
+            # Values orjson rejects (e.g. integers beyond 64 bits) still go through the stdlib encoder
+            pass
+    return _JSON_ENCODE_INDENTED(obj) if indent else _JSON_ENCODE_COMPACT(obj)
+
+
+def encode_json_line(obj: Any) -> bytes:
+    """Serialize to one compact UTF-8 JSON line, newline included, ready to append to a JSONL file."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+    return (_JSON_ENCODE_COMPACT(obj) + "\n").encode("utf-8")
 
 
 # --- Path and Session Utilities ---
+# Anything other than a letter, digit, "_", "-" or "." (\w matches exactly str.isalnum() plus "_")
+_INVALID_SESSION_NAME_CHARS = re.compile(r"[^\w.-]")
+
+
 def ensure_sessions_dir() -> None:
     """Ensures the sessions directory exists."""
     SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
 
 
+@lru_cache(maxsize=1024)
 def sanitize_session_name(name: str) -> str:
     """Convert session name to valid directory name"""
     # Replace invalid characters with underscores
-    sanitized = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    sanitized = _INVALID_SESSION_NAME_CHARS.sub("_", name)
     # Ensure it doesn't start with a dot
     if sanitized.startswith("."):
         sanitized = "_" + sanitized[1:]
@@ -31,84 +79,447 @@ def sanitize_session_name(name: str) -> str:
     return sanitized[:100]
 
 
+@lru_cache(maxsize=512)
 def get_session_dir(session_name: str) -> Path:
-    """Get session directory path from name"""
+    """Get session directory path from name (cached; Path objects are immutable)"""
     return SESSIONS_DIR / sanitize_session_name(session_name)
 
 
+# Directories already created (or found) by ensure_dir, so later calls skip the mkdir syscall
+_ensured_dirs: Set[Path] = set()
+_ensured_dirs_lock = threading.Lock()
+
+
+def ensure_dir(path: Path) -> None:
+    """Create a directory (and parents) once; repeat calls for the same path are a set lookup."""
+    if path in _ensured_dirs:
+        return
+    path.mkdir(parents=True, exist_ok=True)
+    with _ensured_dirs_lock:
+        _ensured_dirs.add(path)
+
+
+def forget_ensured_dir(path: Path) -> None:
+    """Forget that a directory (and anything under it) exists, e.g. before it is renamed or moved away."""
+    with _ensured_dirs_lock:
+        _ensured_dirs.difference_update([known for known in _ensured_dirs if known == path or path in known.parents])
+
+
 def session_exists(session_name: str) -> bool:
     """Check if session exists"""
     return get_session_dir(session_name).exists()
 
 
+# Working directory as of the last change_working_directory call. The server only changes directory through
+# that function, so this saves a getcwd() per use; an os.chdir made elsewhere would not be seen here.
+_current_directory = os.getcwd()
+
+
+def get_working_directory() -> str:
+    """Return the server's current working directory without a getcwd() syscall."""
+    return _current_directory
+
+
+def change_working_directory(directory: str) -> str:
+    """Change the server's working directory and return the new absolute path."""
+    global _current_directory
+    os.chdir(directory)
+    _current_directory = os.getcwd()
+    return _current_directory
+
+
+def resolve_path(path: str) -> Path:
+    """
+    Resolve a user-supplied path to an absolute, symlink-free Path against the server's working directory.
+    Not cached: symlinks and directories can change between calls, and each call must see where they point now.
+    """
+    return Path(_current_directory, path).resolve()
+
+
 # --- Session File Operations ---
+# Summary text per session directory, as load_session_summary would return it; written through by saves
+_summary_cache: Dict[Path, str] = {}
+_summary_cache_lock = threading.Lock()
+
+
 def load_session_summary(session_name: str) -> str:
     """Load session summary; returns summary text or empty string"""
-    summary_path = get_session_dir(session_name) / "summary.txt"
-    if summary_path.exists():
-        return summary_path.read_text(encoding="utf-8").strip()
+    session_dir = get_session_dir(session_name)
+    # Reads on a miss happen under the lock so a concurrent save can't be overwritten by older file contents
+    with _summary_cache_lock:
+        summary = _summary_cache.get(session_dir)
+        if summary is not None:
+            return summary
+        summary_path = session_dir / "summary.txt"
+        if summary_path.exists():
+            summary = summary_path.read_text(encoding="utf-8").strip()
+            _summary_cache[session_dir] = summary
+            return summary
     return ""
 
 
+def read_session_summary_head(session_name: str, max_chars: int) -> str:
+    """
+    Start of the session summary, for previews: at most max_chars + 1 characters, so callers
+    can tell whether there is more. Served from the summary cache when it holds the session,
+    otherwise only the first few KB of summary.txt are read (and nothing is cached).
+    """
+    session_dir = get_session_dir(session_name)
+    with _summary_cache_lock:
+        summary = _summary_cache.get(session_dir)
+    if summary is not None:
+        return summary[:max_chars + 1]
+    
+    # UTF-8 takes at most 4 bytes per character
+    limit = 4 * (max_chars + 1)
+    try:
+        with open(session_dir / "summary.txt", "rb") as f:
+            data = f.read(limit)
+    except FileNotFoundError:
+        return ""
+    # A character cut off at the end of the read is dropped; newlines are translated like read_text
+    text = data.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+    text = text.strip() if len(data) < limit else text.lstrip()
+    return text[:max_chars + 1]
+
+
 def save_session_summary(session_name: str, summary: str) -> None:
     """Save session summary"""
     session_dir = get_session_dir(session_name)
-    session_dir.mkdir(parents=True, exist_ok=True)
-    summary_path = session_dir / "summary.txt"
-    summary_path.write_text(summary, encoding="utf-8")
+    with _summary_cache_lock:
+        # Drop the cached copy first so a failed or partial write is read back from disk next time
+        _summary_cache.pop(session_dir, None)
+        ensure_dir(session_dir)
+        summary_path = session_dir / "summary.txt"
+        summary_path.write_text(summary, encoding="utf-8")
+        _summary_cache[session_dir] = summary.strip()
+
+
+def forget_session_summary(session_name: str) -> None:
+    """Drop a session's cached summary, e.g. when its directory is renamed or moved."""
+    with _summary_cache_lock:
+        _summary_cache.pop(get_session_dir(session_name), None)
+
+
+def release_session_files(session_name: str) -> None:
+    """Close and forget everything cached about a session's directory before it is renamed or moved."""
+    close_session_logs(session_name)
+    forget_session_summary(session_name)
+    forget_ensured_dir(get_session_dir(session_name))
+
+
+# --- Session Log Journal ---
+# JSONL appends are queued by the caller and written by a background journal thread, which groups
+# everything pending per log file into one writev on a cached O_APPEND descriptor. With LOG_FSYNC
+# each batch is also synced once (group commit), and durable appends wait for their batch.
+_journal: Deque[Tuple[int, str, Path, bytes]] = deque()
+_journal_cv = threading.Condition()
+_journal_thread: Optional[threading.Thread] = None
+# Sequence numbers of the last queued line and of the last line written (and synced, with LOG_FSYNC)
+_journal_enqueued = 0
+_journal_committed = 0
+
+_fdatasync = getattr(os, "fdatasync", os.fsync)  # macOS has no fdatasync
+
+# Held while writing a batch or touching the descriptors, so batches land in queue order
+_journal_io_lock = threading.Lock()
+# Open descriptors in least-recently-written order; past _MAX_OPEN_LOG_FDS the oldest is closed
+_log_fds: "OrderedDict[Path, int]" = OrderedDict()
+_MAX_OPEN_LOG_FDS = 64
+
+# Event counts per session, loaded from event_log.jsonl on first use and kept current by appends
+_events_count: Dict[str, int] = {}
+_events_count_lock = threading.RLock()
+
+# Text outputs longer than this (in characters) go to a blobs/ sidecar file instead of the event log line
+_LOG_BLOB_THRESHOLD = 16 * 1024
+_LOG_BLOB_FIELDS = ("stdout", "stderr", "content")
+
+# Read size for counting event log lines
+_COUNT_READ_SIZE = 1 << 20
 
+_LOG_OPEN_FLAGS = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_CLOEXEC", 0)
 
-def append_event_to_log(session_name: str, event: Dict[str, Any]) -> None:
-    """Append event to event log (JSONL format)"""
+# Most buffers passed to a single writev call (the Linux IOV_MAX)
+_JOURNAL_IOV_MAX = 1024
+
+
+def _enqueue_log_line(session_name: str, log_path: Path, line: bytes) -> int:
+    """
+    Queue an encoded JSONL line for the journal thread, starting the thread on first use.
+    Returns the line's sequence number for wait_for_log_commit().
+    """
+    global _journal_thread, _journal_enqueued
+    with _journal_cv:
+        _journal_enqueued += 1
+        _journal.append((_journal_enqueued, session_name, log_path, line))
+        if _journal_thread is None:
+            _journal_thread = threading.Thread(target=_journal_writer, name="log-journal", daemon=True)
+            _journal_thread.start()
+        _journal_cv.notify_all()
+        return _journal_enqueued
+
+
+def wait_for_log_commit(seq: int) -> None:
+    """Block until the journal has written (and, with LOG_FSYNC, synced) line seq."""
+    with _journal_cv:
+        while _journal_committed < seq:
+            _journal_cv.wait()
+
+
+def _journal_writer() -> None:
+    """Background thread: write queued log lines in batches for as long as the process runs."""
+    while True:
+        with _journal_cv:
+            while not _journal:
+                _journal_cv.wait()
+        if LOG_FSYNC:
+            # Let appends arriving just behind this one join the batch and share its sync
+            time.sleep(LOG_GROUP_COMMIT_WINDOW)
+        with _journal_io_lock:
+            failed_sessions = _write_pending_locked()
+        _forget_event_counts(failed_sessions)
+
+
+def _writev_all(fd: int, lines: List[bytes]) -> None:
+    """Write all lines to fd, one writev per IOV_MAX buffers, finishing any short write."""
+    for start in range(0, len(lines), _JOURNAL_IOV_MAX):
+        chunk = lines[start:start + _JOURNAL_IOV_MAX]
+        if hasattr(os, "writev"):
+            written = os.writev(fd, chunk)
+            if written == sum(len(line) for line in chunk):
+                continue
+            remaining = memoryview(b"".join(chunk))[written:]
+        else:
+            remaining = memoryview(b"".join(chunk))
+        while remaining:
+            remaining = remaining[os.write(fd, remaining):]
+
+
+def _write_pending_locked() -> Set[str]:
+    """
+    Write every queued line, grouped per log file in queue order, syncing each file once when
+    LOG_FSYNC is set. The caller holds _journal_io_lock. Returns the sessions whose lines could
+    not be written; those lines still count as committed, so waiters are not stranded.
+    """
+    global _journal_committed
+    with _journal_cv:
+        batch = list(_journal)
+        _journal.clear()
+    if not batch:
+        return set()
+    
+    pending: Dict[Path, List[bytes]] = {}
+    owners: Dict[Path, str] = {}
+    for _, session_name, log_path, line in batch:
+        pending.setdefault(log_path, []).append(line)
+        owners[log_path] = session_name
+    
+    failed_sessions: Set[str] = set()
+    for log_path, lines in pending.items():
+        try:
+            fd = _log_fds.get(log_path)
+            if fd is None:
+                ensure_dir(log_path.parent)
+                fd = os.open(log_path, _LOG_OPEN_FLAGS, 0o644)
+                _log_fds[log_path] = fd
+                if len(_log_fds) > _MAX_OPEN_LOG_FDS:
+                    os.close(_log_fds.popitem(last=False)[1])
+            else:
+                _log_fds.move_to_end(log_path)
+            _writev_all(fd, lines)
+            if LOG_FSYNC:
+                _fdatasync(fd)
+        except Exception as e:
+            failed_sessions.add(owners[log_path])
+            print(f"[journal] failed to append {len(lines)} records to {log_path}: {e}", file=sys.stderr)
+    
+    with _journal_cv:
+        _journal_committed = batch[-1][0]
+        _journal_cv.notify_all()
+    return failed_sessions
+
+
+def _forget_event_counts(session_names: Set[str]) -> None:
+    """Drop cached event counts so they are recounted from the file."""
+    if session_names:
+        with _events_count_lock:
+            for session_name in session_names:
+                _events_count.pop(session_name, None)
+
+
+def flush_logs() -> None:
+    """Write any queued log lines now, from the calling thread."""
+    with _journal_io_lock:
+        failed_sessions = _write_pending_locked()
+    _forget_event_counts(failed_sessions)
+
+
+def close_session_logs(session_name: str) -> None:
+    """Flush and close a session's log descriptors, e.g. before its directory is renamed or moved."""
     session_dir = get_session_dir(session_name)
-    session_dir.mkdir(parents=True, exist_ok=True)
-    log_path = session_dir / "event_log.jsonl"
+    with _events_count_lock:
+        _events_count.pop(session_name, None)
+        with _journal_io_lock:
+            _write_pending_locked()
+            for log_path in [path for path in _log_fds if path.parent == session_dir]:
+                os.close(_log_fds.pop(log_path))
+
+
+def close_all_logs() -> None:
+    """Flush queued log lines and close every cached log descriptor."""
+    with _journal_io_lock:
+        _write_pending_locked()
+        for fd in _log_fds.values():
+            try:
+                os.close(fd)
+            except OSError as e:
+                print(f"[error-log] failed to close log file: {e}", file=sys.stderr)
+        _log_fds.clear()
+
+
+atexit.register(close_all_logs)
+
+
+def _externalize_large_outputs(session_dir: Path, event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return the event with any oversized text outputs moved to sidecar files under blobs/,
+    each replaced by {"blob": "blobs/<file>", "length": N}. The caller's event is not modified.
+    """
+    outputs = event.get("outputs")
+    if not isinstance(outputs, dict):
+        return event
+    large_fields = [
+        field for field in _LOG_BLOB_FIELDS
+        if isinstance(outputs.get(field), str) and len(outputs[field]) > _LOG_BLOB_THRESHOLD
+    ]
+    if not large_fields:
+        return event
     
-    # Append as JSON line
-    with log_path.open("a", encoding="utf-8") as f:
-        json.dump(event, f, ensure_ascii=False)
-        f.write("\n")
+    blobs_dir = session_dir / "blobs"
+    ensure_dir(blobs_dir)
+    outputs = dict(outputs)
+    for field in large_fields:
+        blob_name = f"{uuid.uuid4().hex}.txt"
+        (blobs_dir / blob_name).write_text(outputs[field], encoding="utf-8")
+        outputs[field] = {"blob": f"blobs/{blob_name}", "length": len(outputs[field])}
+    return {**event, "outputs": outputs}
+
+
+def append_event_to_log(session_name: str, event: Dict[str, Any], durable: bool = False) -> None:
+    """
+    Queue an event for the event log (JSONL format); large outputs are stored in blobs/ sidecar
+    files. The line is encoded here and written by the journal thread. With durable=True and
+    LOG_FSYNC set, returns only once the line has been synced to disk.
+    """
+    session_dir = get_session_dir(session_name)
+    line = encode_json_line(_externalize_large_outputs(session_dir, event))
+    with _events_count_lock:
+        seq = _enqueue_log_line(session_name, session_dir / "event_log.jsonl", line)
+        if session_name in _events_count:
+            _events_count[session_name] += 1
+    if durable and LOG_FSYNC:
+        wait_for_log_commit(seq)
+
+
+def _count_lines(path: Path) -> int:
+    """Count lines (a final line without a newline included) with C-level byte counts over 1MB reads."""
+    count = 0
+    last = b"\n"
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            chunk = f.read(_COUNT_READ_SIZE)
+            if not chunk:
+                break
+            count += chunk.count(b"\n")
+            last = chunk[-1:]
+    return count + (last != b"\n")
+
+
+def get_events_count(session_name: str) -> int:
+    """Number of events in the session's event log, counted from the file once and then cached."""
+    with _events_count_lock:
+        count = _events_count.get(session_name)
+        if count is None:
+            # Appends wait on this lock, so after the flush the file holds every queued event
+            flush_logs()
+            log_path = get_session_dir(session_name) / "event_log.jsonl"
+            try:
+                count = _count_lines(log_path)
+            except FileNotFoundError:
+                count = 0
+            except Exception:
+                # Don't cache a failed count
+                return 0
+            _events_count[session_name] = count
+        return count
+
+
+def append_llm_interaction_to_log(session_name: str, interaction: Dict[str, Any]) -> None:
+    """Queue an LLM interaction for the summary log (llm_summary.jsonl); raises if it can't be encoded"""
+    _enqueue_log_line(session_name, get_session_dir(session_name) / "llm_summary.jsonl", encode_json_line(interaction))
 
 
 def append_error_to_log(session_name: str, error: Dict[str, Any]) -> None:
-    """Append error to errors log (JSONL format)"""
+    """Queue an error for the errors log (JSONL format)"""
     try:
-        session_dir = get_session_dir(session_name)
-        session_dir.mkdir(parents=True, exist_ok=True)
-        errors_path = session_dir / "errors.jsonl"
-        
-        # Append as JSON line
-        with errors_path.open("a", encoding="utf-8") as f:
-            json.dump(error, f, ensure_ascii=False)
-            f.write("\n")
+        _enqueue_log_line(session_name, get_session_dir(session_name) / "errors.jsonl", encode_json_line(error))
     except Exception as e:
         # If we can't log the error, at least print it
         print(f"[error-log] failed to log error: {e}", file=sys.stderr)
 
 
 # --- Active Session Management ---
+# The active session name lives only here; a single reference assignment is atomic, so no lock is needed
+_active_session_name: Optional[str] = None
+
+# Within an active_session_scope() the name is read once and then served from this context variable
+_UNPINNED = object()
+_pinned_session_name: ContextVar[Any] = ContextVar("pinned_session_name", default=_UNPINNED)
+
+
 def get_active_session_name() -> Optional[str]:
     """Returns the currently active session name or None."""
-    with _active_session_name_lock:
-        return _active_session_name
+    pinned = _pinned_session_name.get()
+    if pinned is not _UNPINNED:
+        return pinned
+    return _active_session_name
+
+
+@contextmanager
+def active_session_scope() -> Iterator[None]:
+    """
+    Pin the active session name for the duration of one tool call, so the tool and the helpers
+    it calls all see the same session even if another call switches it meanwhile. The pin
+    follows the context into asyncio.to_thread.
+    """
+    token = _pinned_session_name.set(_active_session_name)
+    try:
+        yield
+    finally:
+        _pinned_session_name.reset(token)
 
 
 def set_active_session_name(session_name: Optional[str]) -> None:
     """Sets the currently active session name (or None)."""
-    with _active_session_name_lock:
-        global _active_session_name
-        _active_session_name = session_name
+    global _active_session_name
+    _active_session_name = session_name
+    # Keep a scope opened by the calling tool in step with its own change
+    if _pinned_session_name.get() is not _UNPINNED:
+        _pinned_session_name.set(session_name)
 
 
 # --- Text Processing ---
-def truncate_with_indication(text: str, max_chars: int, from_end: bool = False) -> str:
-    """Truncate text with indication if it was truncated"""
-    if len(text) <= max_chars:
+def truncate_with_indication(text: str, max_chars: int, from_end: bool = False, original_length: Optional[int] = None) -> str:
+    """Truncate text with indication if it was truncated; original_length is reported if text was already cut down"""
+    if original_length is None:
+        original_length = len(text)
+    if original_length <= max_chars:
         return text
     
     if from_end:
         truncated = text[-max_chars:]
-        return f"...(abridged from {len(text)} chars)...{truncated}"
+        return f"...(abridged from {original_length} chars)...{truncated}"
     else:
         truncated = text[:max_chars]
-        return f"{truncated}...(abridged from {len(text)} chars)..."
+        return f"{truncated}...(abridged from {original_length} chars)..."